@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+End-to-end drop benchmark: runs the real main.py against benchmarks/fake_bot_api.py.
+
+Creates `users` funded users with one profile each in a temporary data directory,
+starts the fake Bot API with one scripted limited drop and main.py pointed at it
+(BOT_API_URL), then reports how fast the drop was bought and how much of it sold.
+Extra environment variables (POLL_*, WORKER_SHARDS, ...) are passed to main.py.
+
+Run from the repository root:
+    python benchmarks/bench_e2e.py [users] [drop supply] [latency ms] [flood rate] [duration s]
+"""
+# --- Стандартные библиотеки ---
+import asyncio
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# --- Внутренние модули ---
+from fake_bot_api import FakeBotAPI, default_catalog, make_gift, serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST, PORT = "127.0.0.1", 8082
+OWNER_ID = 1
+DROP_OFFSET = 10  # seconds after start, leaves time for the first (seeding) catalog poll
+DROP_PRICE = 5000
+GIFTS_PER_PROFILE = 3
+
+
+def write_users(data_dir: str, users: int) -> None:
+    os.makedirs(os.path.join(data_dir, "users"))
+    for index in range(users):
+        user_id = 1000 + index
+        profile = {
+            "MIN_PRICE": DROP_PRICE, "MAX_PRICE": DROP_PRICE,
+            "MIN_SUPPLY": 1, "MAX_SUPPLY": 1_000_000,
+            "LIMIT": 1_000_000, "COUNT": GIFTS_PER_PROFILE,
+            "TARGET_USER_ID": user_id, "TARGET_CHAT_ID": None,
+            "BOUGHT": 0, "SPENT": 0, "DONE": False, "OBJECTIVE": "spend",
+        }
+        user = {
+            "user_id": user_id, "balance": DROP_PRICE * GIFTS_PER_PROFILE * 2,
+            "total_deposited": 0, "total_spent": 0, "language": "en",
+            "profiles": [profile], "is_blocked": False, "total_purchases": 0,
+        }
+        with open(os.path.join(data_dir, "users", f"{user_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(user, f)
+
+
+async def main(users: int, supply: int, latency: float, flood_rate: float, duration: float) -> int:
+    """Runs the benchmark; returns the process exit code (1 if the bot exited before `duration`)."""
+    data_dir = tempfile.mkdtemp(prefix="bench_e2e_")
+    write_users(data_dir, users)
+
+    api = FakeBotAPI(
+        default_catalog(8),
+        [(DROP_OFFSET, make_gift("drop0", DROP_PRICE, supply))],
+        latency=latency / 1000,
+        jitter=latency / 4000,
+        flood_rate=flood_rate,
+    )
+    runner = await serve(api, HOST, PORT)
+
+    env = dict(
+        os.environ,
+        TELEGRAM_BOT_TOKEN="123456:FAKE",
+        TELEGRAM_USER_ID=str(OWNER_ID),
+        BOT_API_URL=f"http://{HOST}:{PORT}",
+        PURCHASE_COOLDOWN=os.environ.get("PURCHASE_COOLDOWN", "0"),
+    )
+    log_path = os.path.join(data_dir, "bot.log")
+    with open(log_path, "w") as log:
+        bot = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(ROOT, "main.py"), "--role", "all",
+            cwd=data_dir, env=env, stdout=log, stderr=log
+        )
+        started = time.perf_counter()
+        while time.perf_counter() - started < duration and bot.returncode is None:
+            await asyncio.sleep(0.5)
+        exited_early = bot.returncode is not None
+        if not exited_early:
+            bot.send_signal(signal.SIGINT)
+            try:
+                await asyncio.wait_for(bot.wait(), 10)
+            except asyncio.TimeoutError:
+                bot.kill()
+    await runner.cleanup()
+
+    if exited_early:
+        print(f"FAILED: the bot exited with code {bot.returncode} after {time.perf_counter() - started:.1f} s")
+        with open(log_path, "r", encoding="utf-8", errors="replace") as log:
+            print("".join(log.readlines()[-20:]), end="")
+        print(f"bot log and data: {data_dir}")
+        return 1
+
+    stats = api.stats()
+    drop = stats["drops"].get("drop0", {})
+    wanted = users * GIFTS_PER_PROFILE
+    print(f"users: {users}, supply: {supply}, latency: {latency} ms, flood rate: {flood_rate}")
+    print(f"first sale after drop: {drop.get('first_sale_after')} s")
+    print(f"sold: {drop.get('sold', 0)} / {min(wanted, supply)} possible, sold out after: {drop.get('sold_out_after')} s")
+    print(f"calls: {stats['calls']}")
+    print(f"injected flood waits: {stats['flood_waits']}")
+    print(f"bot log and data: {data_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(asyncio.run(main(
+        users=int(args[0]) if len(args) > 0 else 50,
+        supply=int(args[1]) if len(args) > 1 else 100,
+        latency=float(args[2]) if len(args) > 2 else 30,
+        flood_rate=float(args[3]) if len(args) > 3 else 0.0,
+        duration=float(args[4]) if len(args) > 4 else 40,
+    )))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark of catalog filtering on a synthetic 10k-gift catalog.
+
+Run from the repository root:
+    python benchmarks/bench_gifts.py
+"""
+# --- Стандартные библиотеки ---
+import os
+import random
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# --- Внутренние модули ---
+from services.gifts import GiftSnapshot, normalize_gift
+
+CATALOG_SIZE = 10_000
+ROUNDS = 50
+# (min_price, max_price, min_supply, max_supply) of a typical sniper profile
+PROFILE = (5000, 10000, 1000, 10000)
+
+
+def make_catalog(size: int):
+    """Synthetic get_available_gifts() response."""
+    rng = random.Random(42)
+    gifts = []
+    for i in range(size):
+        limited = rng.random() < 0.3
+        total = rng.randint(500, 50000) if limited else None
+        gifts.append(SimpleNamespace(
+            id=str(i),
+            star_count=rng.choice([15, 25, 50, 100, 350, 500, 1000, 2500, 5000, 7500, 10000, 20000]),
+            total_count=total,
+            remaining_count=rng.randint(0, total) if limited else None,
+            sticker=SimpleNamespace(file_id=f"file_{i}", emoji="🎁"),
+        ))
+    return SimpleNamespace(gifts=gifts)
+
+
+def legacy_filter(api_gifts, min_price, max_price, min_supply, max_supply):
+    """The per-call loop get_filtered_gifts used before GiftSnapshot."""
+    filtered = []
+    for gift in api_gifts.gifts:
+        supply = gift.total_count or 0
+        if min_price <= gift.star_count <= max_price and min_supply <= supply <= max_supply:
+            filtered.append(gift)
+    normalized = [normalize_gift(gift) for gift in filtered]
+    normalized.sort(key=lambda g: g["price"], reverse=True)
+    return normalized
+
+
+def bench(label: str, func, number: int = ROUNDS):
+    """Prints per-call cost of func in microseconds."""
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    print(f"{label:<40} {seconds / number * 1e6:10.1f} µs/call")
+
+
+def main():
+    api_gifts = make_catalog(CATALOG_SIZE)
+    snapshot = GiftSnapshot(api_gifts)
+    assert [g["id"] for g in snapshot.query(*PROFILE)] == [g["id"] for g in legacy_filter(api_gifts, *PROFILE)]
+
+    print(f"catalog: {CATALOG_SIZE:,} gifts")
+    bench("legacy loop + normalize", lambda: legacy_filter(api_gifts, *PROFILE))
+    bench("GiftSnapshot build (once per fetch)", lambda: GiftSnapshot(api_gifts), 5)
+    bench("GiftSnapshot.query, supply range", lambda: snapshot.query(*PROFILE))
+    bench("GiftSnapshot.query, unlimited", lambda: snapshot.query(5000, 10000, unlimited=True))
+    bench("GiftSnapshot.query, narrow band", lambda: snapshot.query(2500, 2500, 1000, 10000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of the localization engine.
+
+Run from the repository root:
+    python benchmarks/bench_localization.py
+"""
+# --- Стандартные библиотеки ---
+import asyncio
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# --- Внутренние модули ---
+from services.database import _user_languages
+from services.localization import TEXTS, get_text, get_text_sync
+
+ROUNDS = 200_000
+MENU_KWARGS = dict(version="2.0.0", balance=12345, profiles_count=2, status="🟢 ONLINE")
+
+
+def bench(label: str, func, number: int = ROUNDS):
+    """Prints per-call cost of func in nanoseconds."""
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    print(f"{label:<40} {seconds / number * 1e9:8.0f} ns/call")
+
+
+def main():
+    bench("raw str.format (baseline)", lambda: TEXTS["en"]["main_menu_user"].format(**MENU_KWARGS))
+    bench("get_text_sync, parameterless", lambda: get_text_sync("en", "deposit_btn"))
+    bench("get_text_sync, fallback ru -> en", lambda: get_text_sync("ru", "admin_panel"))
+    bench("get_text_sync, with params", lambda: get_text_sync("en", "main_menu_user", **MENU_KWARGS))
+
+    # Async wrapper: language already known to the process, so no file I/O
+    _user_languages[1] = "ru"
+    loop = asyncio.new_event_loop()
+
+    async def ten_awaits():
+        for _ in range(10):
+            await get_text(1, "deposit_btn")
+
+    bench("await get_text x10 (one keyboard)", lambda: loop.run_until_complete(ten_awaits()), ROUNDS // 20)
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
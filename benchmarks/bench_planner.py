@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the purchase plan optimizer on synthetic profile matches.
+
+Run from the repository root:
+    python benchmarks/bench_planner.py
+"""
+# --- Стандартные библиотеки ---
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# --- Внутренние модули ---
+from services.planner import OBJECTIVES, plan_purchases
+
+ROUNDS = 200
+PRICES = [15, 25, 50, 100, 350, 500, 1000, 2500, 5000, 7500, 10000, 20000]
+
+
+def make_gifts(size: int, seed: int = 42):
+    """Synthetic normalized gifts sorted by price descending, like get_filtered_gifts."""
+    rng = random.Random(seed)
+    gifts = []
+    for i in range(size):
+        limited = rng.random() < 0.5
+        supply = rng.randint(500, 50000) if limited else None
+        gifts.append({
+            "id": str(i),
+            "price": rng.choice(PRICES),
+            "supply": supply,
+            "left": rng.randint(0, 50) if limited else None,
+        })
+    gifts.sort(key=lambda g: g["price"], reverse=True)
+    return gifts
+
+
+def greedy_spend(gifts, count, budget):
+    """The price-descending greedy loop of process_user_profiles before the planner."""
+    spent = bought = 0
+    for gift in gifts:
+        stock = gift["left"] if gift["supply"] else count
+        while bought < count and spent + gift["price"] <= budget and stock > 0:
+            bought += 1
+            spent += gift["price"]
+            stock -= 1
+    return bought, spent
+
+
+def summary(plan):
+    """(gifts, stars) of a plan."""
+    return sum(k for _, k in plan), sum(gift["price"] * k for gift, k in plan)
+
+
+def bench(label: str, func, number: int = ROUNDS):
+    """Prints per-call cost of func in microseconds."""
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    print(f"{label:<48} {seconds / number * 1e6:10.1f} µs/call")
+
+
+def main():
+    # (gifts, COUNT, budget): typical profile, wide price range, many copies
+    cases = [(10, 5, 12000), (30, 20, 30000), (30, 100, 100000)]
+    for size, count, budget in cases:
+        gifts = make_gifts(size)
+        print(f"\n{size} gifts, COUNT={count}, budget={budget:,}; greedy -> {greedy_spend(gifts, count, budget)}")
+        for objective in OBJECTIVES:
+            print(f"  {objective:<9} -> {summary(plan_purchases(gifts, count, budget, objective))}")
+            bench(f"  plan_purchases({objective})", lambda: plan_purchases(gifts, count, budget, objective))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Local load test of webhook mode: posts synthetic updates to the embedded aiohttp
+endpoint and reports handled updates per second. No Telegram API calls are made.
+
+Run from the repository root:
+    python benchmarks/bench_webhook.py [updates] [client connections] [handler delay ms]
+"""
+# --- Стандартные библиотеки ---
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# --- Сторонние библиотеки ---
+from aiohttp import ClientSession, TCPConnector, web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+
+# --- Внутренние модули ---
+from services.webhook import SECRET_HEADER, WebhookHandler, create_webhook_app
+
+HOST, PORT, PATH, SECRET = "127.0.0.1", 8089, "/webhook", "bench-secret"
+MAX_CONCURRENCY = 64
+
+
+def make_update(update_id: int) -> dict:
+    """Synthetic private text message update."""
+    user = {"id": 1000 + update_id % 500, "is_bot": False, "first_name": "Bench"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user["id"], "type": "private"},
+            "from": user,
+            "text": "/start",
+        },
+    }
+
+
+async def main(total: int, connections: int, delay: float):
+    bot = Bot(token="123456:BENCH")
+    dp = Dispatcher()
+
+    @dp.message()
+    async def on_message(message: Message):
+        # Stand-in for handler I/O (file storage, Bot API call)
+        await asyncio.sleep(delay)
+
+    handler = WebhookHandler(dp, bot, SECRET, MAX_CONCURRENCY)
+    runner = web.AppRunner(create_webhook_app(handler, PATH))
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+
+    url = f"http://{HOST}:{PORT}{PATH}"
+    queue = asyncio.Queue()
+    for update_id in range(total):
+        queue.put_nowait(make_update(update_id))
+
+    async def client(session: ClientSession):
+        while not queue.empty():
+            async with session.post(url, json=queue.get_nowait(), headers={SECRET_HEADER: SECRET}) as response:
+                assert response.status == 200, response.status
+
+    started = time.perf_counter()
+    async with ClientSession(connector=TCPConnector(limit=connections)) as session:
+        await asyncio.gather(*(client(session) for _ in range(connections)))
+    accepted = time.perf_counter() - started
+    await handler.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"{total:,} updates, {connections} connections, handler delay {delay * 1000:.0f} ms, "
+          f"max concurrency {MAX_CONCURRENCY}")
+    print(f"accepted:  {total / accepted:10,.0f} updates/s")
+    print(f"handled:   {handler.handled / elapsed:10,.0f} updates/s")
+    await runner.cleanup()
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(
+        int(args[0]) if args else 5000,
+        int(args[1]) if len(args) > 1 else 32,
+        float(args[2]) / 1000 if len(args) > 2 else 0.005,
+    ))
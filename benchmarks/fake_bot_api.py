@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Telegram Bot API, for offline load tests.
+
+Implements getAvailableGifts, sendGift, getStarTransactions, refundStarPayment,
+sendMessage, editMessageText and deleteMessage (plus getMe, getUpdates and the
+webhook calls the bot makes at startup) with configurable latency, random flood
+waits, finite gift stock and drops scripted at fixed offsets from the start.
+Point the bot at it with BOT_API_URL=http://HOST:PORT. GET /stats returns call
+counts and, per dropped gift, the time from its appearance to the first sale.
+
+Run from the repository root:
+    python benchmarks/fake_bot_api.py --drop 5:5000:1000 --drop 20:10000:300 --latency 30 --flood-rate 0.01
+"""
+# --- Стандартные библиотеки ---
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# --- Сторонние библиотеки ---
+from aiohttp import web
+
+HOST, PORT = "127.0.0.1", 8081
+# Methods of the purchase and notification path; startup calls (getMe, setWebhook...) never get 429
+FLOOD_METHODS = frozenset({
+    "getavailablegifts", "sendgift", "getstartransactions", "refundstarpayment", "sendmessage", "editmessagetext",
+})
+
+
+def make_gift(gift_id: str, price: int, supply: Optional[int] = None) -> dict:
+    """Gift object as returned by getAvailableGifts (limited when `supply` is set)."""
+    gift = {
+        "id": gift_id,
+        "sticker": {
+            "file_id": f"sticker-{gift_id}",
+            "file_unique_id": f"u-{gift_id}",
+            "type": "regular",
+            "width": 512,
+            "height": 512,
+            "is_animated": True,
+            "is_video": False,
+            "emoji": "🎁",
+        },
+        "star_count": price,
+    }
+    if supply:
+        gift["total_count"] = supply
+        gift["remaining_count"] = supply
+    return gift
+
+
+class FakeBotAPI:
+    """
+    In-memory Bot API: catalog, star ledger and message ids of one fake bot.
+
+    Every call waits `latency` ± `jitter` seconds; with probability `flood_rate` a call of
+    FLOOD_METHODS is answered with 429 and `retry_after` instead. Limited gifts sell out when their
+    remaining_count reaches 0. Scripted drops `(offset, gift)` join the catalog
+    `offset` seconds after `start()`.
+    """
+
+    def __init__(
+        self,
+        gifts: List[dict],
+        drops: List[Tuple[float, dict]] = (),
+        stars: int = 1_000_000,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        flood_rate: float = 0.0,
+        retry_after: int = 1,
+    ):
+        """
+        :param gifts: Подарки каталога на старте.
+        :param drops: Пары (секунды от старта, подарок) для сценария дропов.
+        :param stars: Баланс звёзд бота.
+        :param latency: Задержка ответа, секунды.
+        :param jitter: Разброс задержки (±), секунды.
+        :param flood_rate: Доля запросов FLOOD_METHODS, получающих 429.
+        :param retry_after: retry_after в ответах 429, секунды.
+        """
+        self.gifts: Dict[str, dict] = {gift["id"]: gift for gift in gifts}
+        self.drops = sorted(drops, key=lambda drop: drop[0])
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.started_at = time.time()
+        self.stars = stars
+        self.transactions: List[dict] = [
+            {"id": "initial", "amount": stars, "date": int(self.started_at), "source": {"type": "other"}}
+        ]
+        self.refunded = set()
+        self.message_id = 0
+        # Stats
+        self.calls = Counter()
+        self.floods = Counter()
+        self.sold = Counter()
+        self.dropped_at: Dict[str, float] = {}
+        self.first_sale_at: Dict[str, float] = {}
+        self.sold_out_at: Dict[str, float] = {}
+        self.methods = {
+            "getme": self.get_me,
+            "getupdates": self.get_updates,
+            "deletewebhook": self.ok,
+            "setwebhook": self.ok,
+            "getavailablegifts": self.get_available_gifts,
+            "sendgift": self.send_gift,
+            "getstartransactions": self.get_star_transactions,
+            "refundstarpayment": self.refund_star_payment,
+            "sendmessage": self.send_message,
+            "editmessagetext": self.edit_message_text,
+            "deletemessage": self.ok,
+        }
+
+    def start(self) -> None:
+        """Starts the drop script clock."""
+        self.started_at = time.time()
+        asyncio.get_running_loop().create_task(self._run_drops())
+
+    async def _run_drops(self) -> None:
+        for offset, gift in self.drops:
+            await asyncio.sleep(max(0.0, self.started_at + offset - time.time()))
+            self.gifts[gift["id"]] = gift
+            self.dropped_at[gift["id"]] = time.time()
+
+    # --- Methods ---
+
+    async def ok(self, params: dict):
+        return True
+
+    async def get_me(self, params: dict):
+        return {"id": 123456, "is_bot": True, "first_name": "Fake Gift Bot", "username": "fake_gift_bot"}
+
+    async def get_updates(self, params: dict):
+        # Long polling with nothing to deliver
+        await asyncio.sleep(min(float(params.get("timeout") or 0), 1.0))
+        return []
+
+    async def get_available_gifts(self, params: dict):
+        return {"gifts": list(self.gifts.values())}
+
+    async def send_gift(self, params: dict):
+        gift = self.gifts.get(params.get("gift_id"))
+        if gift is None:
+            raise _Error(400, "Bad Request: STARGIFT_INVALID")
+        if "remaining_count" in gift and gift["remaining_count"] <= 0:
+            raise _Error(400, "Bad Request: STARGIFT_USAGE_LIMITED")
+        if self.stars < gift["star_count"]:
+            raise _Error(400, "Bad Request: BALANCE_TOO_LOW")
+        now = time.time()
+        if "remaining_count" in gift:
+            gift["remaining_count"] -= 1
+            if gift["remaining_count"] == 0:
+                self.sold_out_at[gift["id"]] = now
+        self.stars -= gift["star_count"]
+        self.sold[gift["id"]] += 1
+        self.first_sale_at.setdefault(gift["id"], now)
+        self.transactions.append({"id": f"gift-{len(self.transactions)}", "amount": gift["star_count"], "date": int(now)})
+        return True
+
+    async def get_star_transactions(self, params: dict):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        return {"transactions": self.transactions[offset:offset + limit]}
+
+    async def refund_star_payment(self, params: dict):
+        charge_id = params.get("telegram_payment_charge_id")
+        if not charge_id:
+            raise _Error(400, "Bad Request: CHARGE_ID_EMPTY")
+        if charge_id in self.refunded:
+            raise _Error(400, "Bad Request: CHARGE_ALREADY_REFUNDED")
+        self.refunded.add(charge_id)
+        return True
+
+    async def send_message(self, params: dict):
+        self.message_id += 1
+        return self._message(params, self.message_id)
+
+    async def edit_message_text(self, params: dict):
+        return self._message(params, int(params.get("message_id") or 0))
+
+    def _message(self, params: dict, message_id: int) -> dict:
+        chat_id = int(params.get("chat_id") or 0)
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params.get("text", ""),
+        }
+
+    # --- HTTP ---
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        self.calls[method] += 1
+        handler = self.methods.get(method)
+        if handler is None:
+            return _reply_error(404, "Not Found")
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if method in FLOOD_METHODS and random.random() < self.flood_rate:
+            self.floods[method] += 1
+            return _reply_error(429, f"Too Many Requests: retry after {self.retry_after}", retry_after=self.retry_after)
+        try:
+            result = await handler(params)
+        except _Error as e:
+            return _reply_error(e.code, e.description)
+        return web.json_response({"ok": True, "result": result})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> dict:
+        drops = {}
+        for gift_id, dropped_at in self.dropped_at.items():
+            first_sale = self.first_sale_at.get(gift_id)
+            sold_out = self.sold_out_at.get(gift_id)
+            drops[gift_id] = {
+                "sold": self.sold[gift_id],
+                "remaining": self.gifts[gift_id].get("remaining_count"),
+                "first_sale_after": None if first_sale is None else round(first_sale - dropped_at, 3),
+                "sold_out_after": None if sold_out is None else round(sold_out - dropped_at, 3),
+            }
+        return {"calls": dict(self.calls), "flood_waits": dict(self.floods), "drops": drops}
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        app.router.add_get("/bot{token}/{method}", self.handle)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+
+class _Error(Exception):
+    def __init__(self, code: int, description: str):
+        super().__init__(description)
+        self.code = code
+        self.description = description
+
+
+def _reply_error(code: int, description: str, retry_after: Optional[int] = None) -> web.Response:
+    body = {"ok": False, "error_code": code, "description": description}
+    if retry_after is not None:
+        body["parameters"] = {"retry_after": retry_after}
+    return web.json_response(body, status=code)
+
+
+async def serve(api: FakeBotAPI, host: str = HOST, port: int = PORT) -> web.AppRunner:
+    """Starts the fake server and the drop script; returns the runner to clean up."""
+    runner = web.AppRunner(api.create_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    api.start()
+    return runner
+
+
+def parse_drop(value: str, index: int) -> Tuple[float, dict]:
+    """`OFFSET:PRICE:SUPPLY` (SUPPLY 0 — unlimited) -> (offset, gift "drop<index>")."""
+    offset, price, supply = value.split(":")
+    return float(offset), make_gift(f"drop{index}", int(price), int(supply) or None)
+
+
+def default_catalog(count: int) -> List[dict]:
+    """`count` regular gifts: unlimited ones at the usual prices."""
+    prices = (15, 25, 50, 100)
+    return [make_gift(f"gift{index}", prices[index % len(prices)]) for index in range(count)]
+
+
+async def main(args) -> None:
+    api = FakeBotAPI(
+        default_catalog(args.gifts),
+        [parse_drop(value, index) for index, value in enumerate(args.drop)],
+        stars=args.stars,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        flood_rate=args.flood_rate,
+        retry_after=args.retry_after,
+    )
+    await serve(api, args.host, args.port)
+    print(f"Fake Bot API on http://{args.host}:{args.port} (BOT_API_URL), stats on /stats")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(json.dumps(api.stats(), ensure_ascii=False))
+    finally:
+        print(json.dumps(api.stats(), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API for load tests")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--gifts", type=int, default=8, help="regular gifts in the catalog")
+    parser.add_argument("--drop", action="append", default=[], help="OFFSET:PRICE:SUPPLY, seconds from start")
+    parser.add_argument("--stars", type=int, default=1_000_000, help="bot star balance")
+    parser.add_argument("--latency", type=float, default=0, help="response latency, ms")
+    parser.add_argument("--jitter", type=float, default=0, help="latency jitter (±), ms")
+    parser.add_argument("--flood-rate", type=float, default=0, help="share of calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after of injected 429, s")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
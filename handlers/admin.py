@@ -1,7 +1,8 @@
 import logging
 from datetime import datetime
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.filters import Command, CommandObject
+from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKeyboardButton, BufferedInputFile
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
@@ -13,6 +14,11 @@ from services.database import (
 )
 from services.localization import get_text, format_number
 from services.menu import update_menu
+from services.history import catalog_history
+from services.poller import catalog_poller
+from services.gifts import get_catalog_snapshot
+from services.timings import timings
+from services.drops import drop_tracker
 
 logger = logging.getLogger(__name__)
 admin_router = Router()
@@ -95,6 +101,16 @@ async def admin_panel(call: CallbackQuery):
                 callback_data="manage_users"
             )
         ],
+        [
+            InlineKeyboardButton(
+                text="📈 Sell-through Report", 
+                callback_data="sellout_report"
+            ),
+            InlineKeyboardButton(
+                text="🎯 Drop Report", 
+                callback_data="drop_report"
+            )
+        ],
         [
             InlineKeyboardButton(
                 text=await get_text(call.from_user.id, "btn_main_menu"), 
@@ -208,6 +224,110 @@ async def detailed_report(call: CallbackQuery):
     await call.message.edit_text(text, reply_markup=keyboard)
     await call.answer()
 
+@admin_router.callback_query(F.data == "sellout_report")
+async def sellout_report(call: CallbackQuery):
+    """Show limited gifts selling fastest, from the catalog history"""
+    rows = catalog_history.report(limit=10)
+    snapshot = get_catalog_snapshot()
+    
+    lines = ["📈 <b>SELL-THROUGH REPORT</b>", ""]
+    for row in rows:
+        gift = snapshot.get(row["id"]) if snapshot else None
+        emoji = (gift or {}).get("emoji") or "🎁"
+        eta_minutes = row["eta"] / 60
+        lines.append(
+            f"{emoji} <code>{row['id']}</code> — ★{row['price']:,}\n"
+            f"├─ Left: <code>{row['left']:,}</code> / {row['supply']:,}\n"
+            f"├─ Velocity: <code>{row['velocity'] * 60:,.1f}</code> per min\n"
+            f"└─ Sellout in: <code>{eta_minutes:,.1f}</code> min"
+        )
+    if not rows:
+        lines.append(f"💤 No limited gifts selling in the last {int(catalog_history.window // 60)} min")
+    
+    poll = catalog_poller.stats()
+    lines.append(
+        f"\n⏱ <b>POLLING</b>\n"
+        f"├─ Interval: <code>{poll['interval']:.2f}</code> s (avg <code>{poll['avg_gap']:.2f}</code> s)\n"
+        f"├─ Detection latency: avg <code>{poll['avg_latency'] * 1000:,.0f}</code> ms, "
+        f"max <code>{poll['max_latency'] * 1000:,.0f}</code> ms\n"
+        f"└─ Polls: <code>{poll['polls']:,}</code>, flood waits: <code>{poll['flood_waits']}</code>"
+    )
+    
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text=await get_text(call.from_user.id, "btn_back"), 
+                callback_data="admin_panel"
+            )
+        ]
+    ])
+    
+    await call.message.edit_text("\n".join(lines), reply_markup=keyboard)
+    await call.answer()
+
+@admin_router.callback_query(F.data == "drop_report")
+async def drop_report(call: CallbackQuery):
+    """Compare recent drops: first-purchase latency, fill rate, units missed to sellout"""
+    rows = drop_tracker.report(limit=10)
+    
+    lines = ["🎯 <b>DROP REPORT</b>", ""]
+    for row in rows:
+        seen = datetime.fromtimestamp(row["seen_at"]).strftime("%d.%m %H:%M:%S")
+        latency = "—" if row["latency"] is None else f"{row['latency'] * 1000:,.0f} ms"
+        fill = "—" if row["fill_rate"] is None else f"{row['fill_rate'] * 100:.0f}%"
+        supply = f"{row['supply']:,}" if row["supply"] else "∞"
+        lines.append(
+            f"🎁 <code>{row['gift_id']}</code> — ★{row['price']:,}, supply {supply}\n"
+            f"├─ Seen: <code>{seen}</code>{' · sold out' if row['sold_out_at'] else ''}"
+            f"{' · open at shutdown' if row.get('open') else ''}\n"
+            f"├─ First purchase: <code>{latency}</code>\n"
+            f"└─ Bought: <code>{row['bought']}</code> / {row['wanted']} ({fill}), "
+            f"missed to sellout: <code>{row['missed_sold_out']}</code>"
+        )
+    if not rows:
+        lines.append("💤 No new gifts since the bot started")
+    
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text=await get_text(call.from_user.id, "btn_back"), 
+                callback_data="admin_panel"
+            )
+        ]
+    ])
+    
+    await call.message.edit_text("\n".join(lines), reply_markup=keyboard)
+    await call.answer()
+
+@admin_router.message(Command("timings"))
+async def timings_report(message: Message, command: CommandObject, is_owner: bool = False):
+    """
+    Purchase-path stage latencies: /timings — report, /timings json — JSON dump,
+    /timings reset — clear samples of this process.
+    """
+    if not is_owner:
+        return
+    arg = (command.args or "").strip().lower()
+    if arg == "json":
+        await message.answer_document(BufferedInputFile(timings.dump().encode(), filename="timings.json"))
+        return
+    if arg == "reset":
+        timings.reset()
+        await message.answer("🧹 Stage timings cleared")
+        return
+    
+    stages = timings.summary()
+    lines = ["⏱ <b>PURCHASE PATH TIMINGS</b> (ms)", ""]
+    for name, stage in stages.items():
+        lines.append(
+            f"<b>{name}</b> ×{stage['count']:,}\n"
+            f"└─ p50 <code>{stage['p50'] * 1000:,.1f}</code> · p95 <code>{stage['p95'] * 1000:,.1f}</code> · "
+            f"p99 <code>{stage['p99'] * 1000:,.1f}</code> · max <code>{stage['max'] * 1000:,.1f}</code>"
+        )
+    if not stages:
+        lines.append("💤 No samples yet" if timings.enabled else "💤 Disabled, set TIMINGS_ENABLED=true")
+    await message.answer("\n".join(lines))
+
 @admin_router.callback_query(F.data == "change_commission_rate")
 async def change_commission_rate_prompt(call: CallbackQuery, state: FSMContext):
     """Prompt to change commission rate"""
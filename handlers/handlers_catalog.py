@@ -10,8 +10,8 @@ from aiogram.exceptions import TelegramBadRequest
 
 # --- Внутренние модули ---
 from services.config import get_target_display_local
-from services.menu import update_menu
-from services.gifts import get_filtered_gifts
+from services.menu import update_menu, detach_menu_message
+from services.gifts import get_filtered_gifts, publish_catalog, resolve_catalog_gift, get_catalog_snapshot
 from services.buy import buy_gift
 from services.balance import refresh_balance
 
@@ -26,24 +26,92 @@ class CatalogFSM(StatesGroup):
     waiting_confirm = State()
 
 
-def gifts_catalog_keyboard(gifts):
+CATALOG_PAGE_SIZE = 8
+
+SORT_LABELS = {"pd": "★ ↓", "pa": "★ ↑", "lf": "🔥 Left"}
+BAND_LABELS = {"a": "All", "p1": "≤100", "p2": "101–1000", "p3": ">1000"}
+
+# Page keyboards of the current catalog snapshot: (version, sort, band, limited, page) -> markup
+_page_keyboards = {}
+
+
+def gift_button(gift) -> InlineKeyboardButton:
     """
-    Forms keyboard for catalog подарков. 
-    Каждый подарок — отдельная кнопка, плюс кнопка возврата в меню.
+    Кнопка одного подарка каталога.
     """
-    keyboard = []
-    for gift in gifts:
-        if gift['supply'] == None:
-            btn = InlineKeyboardButton(
-                text=f"{gift['emoji']} — ★{gift['price']:,}",
-                callback_data=f"catalog_gift_{gift['id']}"
-            )
-        else:
-            btn = InlineKeyboardButton(
-                text=f"{gift['left']:,} из {gift['supply']:,} — ★{gift['price']:,}",
-                callback_data=f"catalog_gift_{gift['id']}"
-            )
-        keyboard.append([btn])
+    if gift['supply'] == None:
+        text = f"{gift['emoji']} — ★{gift['price']:,}"
+    else:
+        text = f"{gift['left']:,} из {gift['supply']:,} — ★{gift['price']:,}"
+    return InlineKeyboardButton(text=text, callback_data=f"catalog_gift_{gift['id']}")
+
+
+def page_callback(sort, band, limited, page) -> str:
+    """
+    Callback data of a catalog page: catalog_page_<sort>_<band>_<limited>_<page>.
+    """
+    return f"catalog_page_{sort}_{band}_{int(limited)}_{page}"
+
+
+def gifts_catalog_keyboard(snapshot, page=0, sort="pd", band="a", limited=False):
+    """
+    Forms one page of the catalog keyboard: gifts, navigation, sorting and filters.
+    Pages are built once per catalog snapshot and reused for every user.
+    """
+    # Normalize before keying the cache: callback data may carry any values
+    sort = sort if sort in SORT_LABELS else "pd"
+    band = band if band in BAND_LABELS else "a"
+    limited = bool(limited)
+    gifts = snapshot.view(sort, band, limited)
+    pages = max(1, -(-len(gifts) // CATALOG_PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+
+    key = (snapshot.version, sort, band, limited, page)
+    cached = _page_keyboards.get(key)
+    if cached is not None:
+        return cached
+    if any(k[0] != snapshot.version for k in _page_keyboards):
+        _page_keyboards.clear()
+
+    keyboard = [
+        [gift_button(gift)]
+        for gift in gifts[page * CATALOG_PAGE_SIZE:(page + 1) * CATALOG_PAGE_SIZE]
+    ]
+
+    # Navigation
+    keyboard.append([
+        InlineKeyboardButton(
+            text="⬅️" if page > 0 else "·",
+            callback_data=page_callback(sort, band, limited, page - 1) if page > 0 else "catalog_noop"
+        ),
+        InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="catalog_noop"),
+        InlineKeyboardButton(
+            text="➡️" if page < pages - 1 else "·",
+            callback_data=page_callback(sort, band, limited, page + 1) if page < pages - 1 else "catalog_noop"
+        ),
+    ])
+    # Sorting (resets to the first page)
+    keyboard.append([
+        InlineKeyboardButton(
+            text=f"• {label}" if code == sort else label,
+            callback_data=page_callback(code, band, limited, 0)
+        )
+        for code, label in SORT_LABELS.items()
+    ])
+    # Price band and limited-only filters
+    keyboard.append([
+        InlineKeyboardButton(
+            text=f"• {label}" if code == band else label,
+            callback_data=page_callback(sort, code, limited, 0)
+        )
+        for code, label in BAND_LABELS.items()
+    ])
+    keyboard.append([
+        InlineKeyboardButton(
+            text="💎 Limited only ✅" if limited else "💎 Limited only",
+            callback_data=page_callback(sort, band, not limited, 0)
+        )
+    ])
 
     # Back to main menu button  
     keyboard.append([
@@ -53,7 +121,9 @@ def gifts_catalog_keyboard(gifts):
         )
     ])
 
-    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+    markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
+    _page_keyboards[key] = markup
+    return markup
 
 
 @wizard_router.callback_query(F.data == "catalog")
@@ -70,8 +140,9 @@ async def catalog(call: CallbackQuery, state: FSMContext):
         unlimited = True
     )
 
-    # Сохраняем текущий каталог в FSM — нужен для последующих шагов
-    await state.update_data(gifts_catalog=gifts)
+    # В FSM храним только версию общего снимка каталога, а не сами подарки
+    snapshot = publish_catalog(gifts)
+    await state.update_data(catalog_version=snapshot.version)
 
     gifts_limited = [g for g in gifts if g['supply'] != None]
     gifts_unlimited = [g for g in gifts if g['supply'] == None]
@@ -81,11 +152,50 @@ async def catalog(call: CallbackQuery, state: FSMContext):
                                 unlimited=len(gifts_unlimited), 
                                 limited=len(gifts_limited))
     
-    await call.message.answer(header_text, reply_markup=gifts_catalog_keyboard(gifts))
+    await call.message.answer(header_text, reply_markup=gifts_catalog_keyboard(snapshot))
 
     await call.answer()
 
 
+@wizard_router.callback_query(F.data.startswith("catalog_page_"))
+async def on_catalog_page(call: CallbackQuery, state: FSMContext):
+    """
+    Листает, сортирует и фильтрует каталог по текущему снимку — без запроса к API.
+    """
+    snapshot = get_catalog_snapshot()
+    if snapshot is None:
+        from services.localization import get_text
+        outdated_text = await get_text(call.from_user.id, "catalog_outdated")
+        await call.answer(outdated_text, show_alert=True)
+        await safe_edit_text(call.message, outdated_text, reply_markup=None)
+        return
+
+    try:
+        sort, band, limited, page = call.data[len("catalog_page_"):].split("_")
+        if sort not in SORT_LABELS or band not in BAND_LABELS:
+            raise ValueError(call.data)
+        keyboard = gifts_catalog_keyboard(snapshot, int(page), sort, band, limited == "1")
+    except ValueError:
+        await call.answer()
+        return
+
+    await state.update_data(catalog_version=snapshot.version)
+    await call.answer()
+    try:
+        await call.message.edit_reply_markup(reply_markup=keyboard)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+
+
+@wizard_router.callback_query(F.data == "catalog_noop")
+async def on_catalog_noop(call: CallbackQuery):
+    """
+    Кнопки-индикаторы каталога (номер страницы) ничего не делают.
+    """
+    await call.answer()
+
+
 @wizard_router.callback_query(F.data == "catalog_main_menu")
 async def start_callback(call: CallbackQuery, state: FSMContext):
     """
@@ -98,6 +208,7 @@ async def start_callback(call: CallbackQuery, state: FSMContext):
     
     await call.answer()
     await safe_edit_text(call.message, closed_text, reply_markup=None)
+    await detach_menu_message(call.from_user.id, call.message.message_id)
     await refresh_balance(call.bot)
     await update_menu(
         bot=call.bot,
@@ -112,20 +223,20 @@ async def on_gift_selected(call: CallbackQuery, state: FSMContext):
     """
     Хендлер выбора подарка из каталога. Запрашивает у пользователя количество для покупки.
     """
+    from services.localization import get_text
     gift_id = call.data.split("_")[-1]
     data = await state.get_data()
-    gifts = data.get("gifts_catalog", [])
-    if not gifts:
+    # Stale snapshot resolves against the current one; None if the gift is gone
+    gift = resolve_catalog_gift(data.get("catalog_version"), gift_id)
+    if not gift:
         outdated_text = await get_text(call.from_user.id, "catalog_outdated")
         await call.answer(outdated_text, show_alert=True)
         await safe_edit_text(call.message, outdated_text, reply_markup=None)
         return
-    gift = next((g for g in gifts if str(g['id']) == gift_id), None)
 
     gift_display = f"{gift['left']:,} из {gift['supply']:,}" if gift.get("supply") != None else gift.get("emoji")
 
-    await state.update_data(selected_gift=gift)
-    from services.localization import get_text
+    await state.update_data(selected_gift_id=gift["id"])
     
     text = await get_text(call.from_user.id, "gift_selected", 
                          gift_display=gift_display, 
@@ -167,7 +278,13 @@ async def on_quantity_entered(message: Message, state: FSMContext):
 
     # Get data for confirmation
     data = await state.get_data()
-    gift = data["selected_gift"]
+    gift = resolve_catalog_gift(data.get("catalog_version"), data.get("selected_gift_id"))
+    if not gift:
+        from services.localization import get_text
+        outdated_text = await get_text(message.from_user.id, "catalog_outdated")
+        await state.clear()
+        await message.answer(outdated_text)
+        return
     price = gift.get("price")
     total = price * qty
 
@@ -204,7 +321,7 @@ async def confirm_purchase(call: CallbackQuery, state: FSMContext):
     Подтверждение и запуск покупки выбранного подарка в заданном количестве для выбранного получателя.
     """
     data = await state.get_data()
-    gift = data["selected_gift"]
+    gift = resolve_catalog_gift(data.get("catalog_version"), data.get("selected_gift_id"))
     from services.localization import get_text
     
     if not gift:
@@ -215,6 +332,7 @@ async def confirm_purchase(call: CallbackQuery, state: FSMContext):
     
     processing_text = await get_text(call.from_user.id, "purchase_processing")
     await call.message.edit_text(text=processing_text, reply_markup=None)
+    await detach_menu_message(call.from_user.id, call.message.message_id)
     gift_id = gift.get("id")
     gift_price = gift.get("price")
     qty = data["selected_qty"]
@@ -273,6 +391,7 @@ async def cancel_callback(call: CallbackQuery, state: FSMContext):
     await state.clear()
     await call.answer()
     await safe_edit_text(call.message, cancelled_text, reply_markup=None)
+    await detach_menu_message(call.from_user.id, call.message.message_id)
     await update_menu(bot=call.bot, chat_id=call.message.chat.id, user_id=call.from_user.id, message_id=call.message.message_id)
 
 
@@ -5,6 +5,7 @@ from aiogram.filters import CommandStart
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, Message
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
+import html
 import logging
 
 # --- Внутренние модули ---
@@ -12,6 +13,7 @@ from services.database import get_user_data, save_user_data, get_owner_data
 from services.menu import update_menu
 from services.balance import refresh_balance
 from services.buy import buy_gift
+from services.owner_digest import owner_digest, COMMISSION, DONATION
 
 logger = logging.getLogger(__name__)
 
@@ -215,7 +217,7 @@ def register_main_handlers(dp, bot, version):
         Process successful payment with commission deduction for multi-user system.
         Enhanced to track developer donations.
         """
-        from services.database import get_owner_data, add_commission, update_user_balance, save_owner_data
+        from services.database import get_owner_data, save_owner_data, process_deposit
         from services.localization import get_text
         
         # Check if this is a developer donation
@@ -237,46 +239,49 @@ def register_main_handlers(dp, bot, version):
             try:
                 owner_id = owner_data.get("owner_id")
                 if owner_id and owner_id != message.from_user.id:
+                    user_name = message.from_user.first_name or "Unknown"
                     donation_notification = (
                         f"💝 <b>NEW DONATION RECEIVED!</b>\n\n"
-                        f"👤 <b>From:</b> {message.from_user.first_name or 'Unknown'} ({message.from_user.id})\n"
+                        f"👤 <b>From:</b> {html.escape(user_name)} ({message.from_user.id})\n"
                         f"⭐ <b>Amount:</b> {message.successful_payment.total_amount} stars\n"
                         f"📊 <b>Total Donations:</b> {owner_data['developer_donations']} donations\n"
                         f"💰 <b>Total Received:</b> {owner_data['total_donations_received']} stars\n\n"
                         f"🙏 <b>Thank you for the generous support!</b>"
                     )
-                    await bot.send_message(owner_id, donation_notification)
+                    owner_digest.add(
+                        bot,
+                        owner_id,
+                        DONATION,
+                        message.from_user.id,
+                        user_name,
+                        message.successful_payment.total_amount,
+                        donation_notification
+                    )
             except Exception as e:
                 logger.error(f"Failed to send donation notification: {e}")
             
             return
         
-        # Regular deposit processing
-        # Get payment amount
+        # Regular deposit processing: credit user and commission at once, skip re-delivered payments
         total_amount = message.successful_payment.total_amount
-        
-        # Get commission rate
-        owner_data = await get_owner_data()
-        commission_rate = owner_data.get("commission_rate", 0.05)
-        
-        # Calculate commission and user amount
-        commission = int(total_amount * commission_rate)
-        user_amount = total_amount - commission
-        
-        # Add commission to owner balance
-        await add_commission(commission, message.from_user.id)
-        
-        # Add amount to user balance
-        await update_user_balance(message.from_user.id, user_amount)
+        deposit = await process_deposit(
+            message.from_user.id,
+            message.successful_payment.telegram_payment_charge_id,
+            total_amount
+        )
+        if deposit is None:
+            return
+        commission = deposit["commission"]
+        owner_id = deposit["owner_id"] or message.from_user.id
         
         # Send success message with commission info
         success_text = await get_text(
             message.from_user.id,
             "deposit_success",
             total_amount=total_amount,
-            user_amount=user_amount,
+            user_amount=deposit["user_amount"],
             commission=commission,
-            rate=commission_rate * 100
+            rate=deposit["commission_rate"] * 100
         )
         
         await message.answer(
@@ -285,25 +290,30 @@ def register_main_handlers(dp, bot, version):
         )
         
         # Send commission notification to owner (if not the owner depositing)
-        if message.from_user.id != owner_data.get("owner_id", message.from_user.id):
+        if message.from_user.id != owner_id:
             try:
-                owner_balance = (await get_owner_data())["commission_balance"]
+                user_name = message.from_user.first_name or "Unknown"
                 notification_text = await get_text(
-                    owner_data.get("owner_id", message.from_user.id),
+                    owner_id,
                     "commission_notification",
                     commission=commission,
-                    user_name=message.from_user.first_name or "Unknown",
-                    balance=owner_balance
+                    user_name=html.escape(user_name),
+                    balance=deposit["commission_balance"]
                 )
-                await bot.send_message(
-                    owner_data.get("owner_id", message.from_user.id),
+                owner_digest.add(
+                    bot,
+                    owner_id,
+                    COMMISSION,
+                    message.from_user.id,
+                    user_name,
+                    commission,
                     notification_text
                 )
             except Exception as e:
                 logger.error(f"Failed to send commission notification: {e}")
         
         # Update menu
-        is_owner = message.from_user.id == owner_data.get("owner_id", message.from_user.id)
+        is_owner = message.from_user.id == owner_id
         await update_menu(
             bot=bot, 
             chat_id=message.chat.id, 
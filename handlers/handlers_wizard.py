@@ -11,10 +11,12 @@ from aiogram.exceptions import TelegramBadRequest, TelegramAPIError
 
 # --- Внутренние модули ---
 from services.config import get_valid_config, get_target_display, save_config
-from services.menu import update_menu, payment_keyboard
+from services.menu import update_menu, detach_menu_message, payment_keyboard
 from services.balance import refresh_balance, refund_all_star_payments
 from services.config import CURRENCY, MAX_PROFILES, add_profile, remove_profile, update_profile
 from services.localization import get_text
+from services.planner import OBJECTIVES, DEFAULT_OBJECTIVE
+from services.database import get_user_data, update_user_data
 
 logger = logging.getLogger(__name__)
 wizard_router = Router()
@@ -111,6 +113,7 @@ def profile_text(profile, idx, user_id):
             f"│ 📦 Supply: <code>{profile.get('MIN_SUPPLY'):,}</code> - <code>{profile.get('MAX_SUPPLY'):,}</code> left   │\n"
             f"│ 🎁 Count: <code>{profile.get('COUNT'):,}</code> gifts max         │\n"
             f"│ 💸 Limit: <code>{profile.get('LIMIT'):,}</code> coins budget      │\n"
+            f"│ 🎯 Goal: {OBJECTIVES.get(profile.get('OBJECTIVE'), OBJECTIVES[DEFAULT_OBJECTIVE])}         │\n"
             f"│ 👤 Target: {target_display}         │\n"
             f"└─────────────────────────────────┘\n\n"
             f"<b>Select setting to modify:</b>")
@@ -133,6 +136,9 @@ def profile_edit_keyboard(idx):
             ],
             [
                 InlineKeyboardButton(text="👤 Target", callback_data=f"edit_profile_target_{idx}"),
+                InlineKeyboardButton(text="🎯 Goal", callback_data=f"edit_profile_objective_{idx}")
+            ],
+            [
                 InlineKeyboardButton(text="⬅️ Back", callback_data=f"edit_profiles_menu_{idx}")
             ]
         ]
@@ -146,8 +152,7 @@ async def on_profile_edit(call: CallbackQuery, state: FSMContext):
     Показывает все параметры профиля и инлайн-кнопки для выбора нужного параметра для изменения.
     """
     idx = int(call.data.split("_")[-1])
-    config = await get_valid_config(call.from_user.id)
-    profile = config["PROFILES"][idx]
+    profile = await stored_profile(call.from_user.id, idx)
     await state.update_data(profile_index=idx)
     await state.update_data(message_id=call.message.message_id)
     await call.message.edit_text(
@@ -238,6 +243,50 @@ async def edit_profile_target(call: CallbackQuery, state: FSMContext):
     await call.answer()
 
 
+async def stored_profile(user_id: int, idx: int) -> dict:
+    """
+    Profile as the purchase worker sees it (users/{id}.json); falls back to config.json
+    for a profile the user record doesn't have.
+    """
+    user_data = await get_user_data(user_id)
+    profiles = user_data.get("profiles", [])
+    if idx < len(profiles):
+        return profiles[idx]
+    config = await get_valid_config(user_id)
+    return config["PROFILES"][idx]
+
+
+@wizard_router.callback_query(lambda c: c.data.startswith("edit_profile_objective_"))
+async def edit_profile_objective(call: CallbackQuery):
+    """
+    Switches the purchase plan objective of the profile to the next one
+    (max spend → max count → max scarcity) and refreshes the profile screen.
+    The objective is stored in the user record read by the purchase worker.
+    """
+    idx = int(call.data.split("_")[-1])
+    objectives = list(OBJECTIVES)
+
+    def next_objective(data: dict):
+        profiles = data.get("profiles", [])
+        if idx < len(profiles):
+            current = profiles[idx].get("OBJECTIVE", DEFAULT_OBJECTIVE)
+            position = objectives.index(current) if current in objectives else -1
+            profiles[idx]["OBJECTIVE"] = objectives[(position + 1) % len(objectives)]
+
+    user_data = await update_user_data(call.from_user.id, next_objective)
+    profiles = user_data.get("profiles", [])
+    if idx >= len(profiles):
+        await call.answer()
+        return
+    profile = profiles[idx]
+    await safe_edit_text(
+        call.message,
+        profile_text(profile, idx, call.from_user.id),
+        reply_markup=profile_edit_keyboard(idx)
+    )
+    await call.answer(OBJECTIVES[profile["OBJECTIVE"]])
+
+
 @wizard_router.callback_query(lambda c: c.data.startswith("edit_profiles_menu_"))
 async def edit_profiles_menu(call: CallbackQuery):
     """
@@ -571,6 +620,7 @@ async def start_callback(call: CallbackQuery, state: FSMContext):
     await state.clear()
     await call.answer()
     await safe_edit_text(call.message, "✅ Profile editing completed.", reply_markup=None)
+    await detach_menu_message(call.from_user.id, call.message.message_id)
     await refresh_balance(call.bot)
     await update_menu(
         bot=call.bot,
@@ -1082,6 +1132,7 @@ async def withdraw_all_confirmed(call: CallbackQuery):
     from services.database import update_user_balance, get_user_data, get_owner_data, save_owner_data
     
     await call.message.edit_text("⏳ Withdrawing stars...")
+    await detach_menu_message(call.from_user.id, call.message.message_id)
 
     async def send_status(msg):
         await call.message.answer(msg)
@@ -1101,7 +1152,6 @@ async def withdraw_all_confirmed(call: CallbackQuery):
 
     # Execute star refunds with user's actual balance limit
     # CRITICAL FIX: Convert user balance (coins) to equivalent stars for withdrawal
-    from services.database import get_owner_data, save_owner_data
     owner_data = await get_owner_data()
     commission_rate = owner_data.get("commission_rate", 0.10)
     # Calculate equivalent stars: if user has X coins, they can withdraw X / (1 - commission_rate) stars
@@ -1174,6 +1224,7 @@ async def withdraw_all_cancel(call: CallbackQuery):
     Обработка отмены возврата всех звёзд.
     """
     await call.message.edit_text("🚫 Action cancelled.")
+    await detach_menu_message(call.from_user.id, call.message.message_id)
     await call.answer()
     await update_menu(bot=call.bot, chat_id=call.message.chat.id, user_id=call.from_user.id, message_id=call.message.message_id)
 
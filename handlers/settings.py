@@ -3,7 +3,7 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 
 from services.database import set_user_language
-from services.localization import get_text
+from services.localization import get_text, get_text_sync, user_language, SUPPORTED_LANGUAGES
 from services.menu import update_menu
 
 logger = logging.getLogger(__name__)
@@ -37,10 +37,16 @@ async def language_menu(call: CallbackQuery):
     """Show language selection menu"""
     text = await get_text(call.from_user.id, "language_select")
     
+    current = user_language(call.from_user.id)
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
-            InlineKeyboardButton(text="🇺🇸 English (Active)", callback_data="language_en_selected")
-        ],
+            InlineKeyboardButton(
+                text=get_text_sync(current, f"language_{language}") + (" ✅" if language == current else ""),
+                callback_data=f"set_language_{language}"
+            )
+        ]
+        for language in SUPPORTED_LANGUAGES
+    ] + [
         [
             InlineKeyboardButton(
                 text=await get_text(call.from_user.id, "btn_back"), 
@@ -56,6 +62,9 @@ async def language_menu(call: CallbackQuery):
 async def set_language_handler(call: CallbackQuery):
     """Handle language change"""
     language = call.data.split("_")[-1]  # Extract language code
+    if language not in SUPPORTED_LANGUAGES:
+        await call.answer()
+        return
     
     # Set user language
     await set_user_language(call.from_user.id, language)
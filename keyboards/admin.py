@@ -4,11 +4,13 @@ Clean, organized layouts with human-friendly button text
 """
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from core.config import CallbackData, UIConstants
+from .cached import cached_keyboard
 
 class AdminKeyboards:
     """Professional admin panel keyboards"""
     
     @staticmethod
+    @cached_keyboard
     def main_dashboard() -> InlineKeyboardMarkup:
         """Main owner control panel with organized sections"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -59,6 +61,7 @@ class AdminKeyboards:
         ])
     
     @staticmethod
+    @cached_keyboard
     def commission_management() -> InlineKeyboardMarkup:
         """Commission settings management panel"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -91,6 +94,7 @@ class AdminKeyboards:
         ])
     
     @staticmethod
+    @cached_keyboard
     def user_management() -> InlineKeyboardMarkup:
         """User management operations"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -133,6 +137,7 @@ class AdminKeyboards:
         ])
     
     @staticmethod
+    @cached_keyboard
     def system_settings() -> InlineKeyboardMarkup:
         """System configuration options"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -175,6 +180,7 @@ class AdminKeyboards:
         ])
     
     @staticmethod
+    @cached_keyboard
     def confirmation_dialog(action: str, confirm_data: str, cancel_data: str = None) -> InlineKeyboardMarkup:
         """Generic confirmation dialog for dangerous actions"""
         cancel_callback = cancel_data or CallbackData.ADMIN_DASHBOARD
@@ -193,6 +199,7 @@ class AdminKeyboards:
         ])
     
     @staticmethod
+    @cached_keyboard
     def withdrawal_confirmation(amount: int) -> InlineKeyboardMarkup:
         """Specific confirmation for commission withdrawal"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -211,6 +218,7 @@ class AdminKeyboards:
         ])
     
     @staticmethod
+    @cached_keyboard
     def rate_change_options() -> InlineKeyboardMarkup:
         """Quick commission rate change options"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -233,6 +241,7 @@ class AdminKeyboards:
         ])
     
     @staticmethod
+    @cached_keyboard
     def navigation_back(target: str) -> InlineKeyboardMarkup:
         """Simple back navigation button"""
         callback_map = {
@@ -0,0 +1,24 @@
+"""
+Keyboard memoization helpers for Area 51 Bot
+Static keyboards are built once and shared between handlers
+"""
+from functools import lru_cache, wraps
+
+from aiogram.types import InlineKeyboardMarkup
+from pydantic import ConfigDict
+
+class FrozenInlineKeyboardMarkup(InlineKeyboardMarkup):
+    """Shared keyboard instance: reassigning its fields raises instead of corrupting the cache"""
+    
+    model_config = ConfigDict(frozen=True)
+
+def cached_keyboard(builder):
+    """Memoize a keyboard builder by its (hashable) arguments and freeze the result"""
+    
+    @lru_cache(maxsize=256)
+    @wraps(builder)
+    def cached(*args, **kwargs) -> InlineKeyboardMarkup:
+        markup = builder(*args, **kwargs)
+        return FrozenInlineKeyboardMarkup.model_construct(inline_keyboard=markup.inline_keyboard)
+    
+    return cached
@@ -5,11 +5,13 @@ Clean, intuitive layouts for regular users
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from typing import List, Dict, Optional
 from core.config import CallbackData, UIConstants
+from .cached import cached_keyboard
 
 class UserKeyboards:
     """Professional user panel keyboards"""
     
     @staticmethod
+    @cached_keyboard
     def main_panel() -> InlineKeyboardMarkup:
         """Main user panel with logical grouping"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -62,11 +64,20 @@ class UserKeyboards:
     @staticmethod
     def profile_management(profiles: List[Dict]) -> InlineKeyboardMarkup:
         """Dynamic profile management keyboard"""
+        # Only the completion flags affect the layout, so they are the cache key
+        return UserKeyboards._profile_management(
+            tuple(profile.get("DONE", False) for profile in profiles[:10])  # Limit to 10 profiles
+        )
+    
+    @staticmethod
+    @cached_keyboard
+    def _profile_management(done_flags: tuple) -> InlineKeyboardMarkup:
+        """Profile management keyboard for the given profile completion flags"""
         keyboard = []
         
         # Add profile buttons (max 5 per row, then wrap)
-        for i, profile in enumerate(profiles[:10]):  # Limit to 10 profiles
-            status_emoji = "✅" if profile.get("DONE", False) else "🟡"
+        for i, done in enumerate(done_flags):
+            status_emoji = "✅" if done else "🟡"
             keyboard.append([
                 InlineKeyboardButton(
                     text=f"{status_emoji} Profile {i + 1}", 
@@ -97,6 +108,7 @@ class UserKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
     @staticmethod
+    @cached_keyboard
     def profile_detail(profile_index: int, is_active: bool = True) -> InlineKeyboardMarkup:
         """Individual profile management options"""
         keyboard = []
@@ -154,6 +166,7 @@ class UserKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
     @staticmethod
+    @cached_keyboard
     def deposit_options() -> InlineKeyboardMarkup:
         """Deposit amount quick select"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -176,6 +189,7 @@ class UserKeyboards:
         ])
     
     @staticmethod
+    @cached_keyboard
     def withdrawal_options() -> InlineKeyboardMarkup:
         """Withdrawal options with different methods"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -206,6 +220,7 @@ class UserKeyboards:
         ])
     
     @staticmethod
+    @cached_keyboard
     def gift_store_categories() -> InlineKeyboardMarkup:
         """Gift store with categorized browsing"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -248,6 +263,7 @@ class UserKeyboards:
         ])
     
     @staticmethod
+    @cached_keyboard
     def settings_panel() -> InlineKeyboardMarkup:
         """User settings and preferences"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -290,6 +306,7 @@ class UserKeyboards:
         ])
     
     @staticmethod
+    @cached_keyboard
     def confirmation_dialog(action: str, confirm_data: str, cancel_data: str = None) -> InlineKeyboardMarkup:
         """Generic confirmation dialog"""
         cancel_callback = cancel_data or CallbackData.BACK_TO_MAIN
@@ -308,6 +325,7 @@ class UserKeyboards:
         ])
     
     @staticmethod
+    @cached_keyboard
     def pagination(current_page: int, total_pages: int, base_callback: str) -> InlineKeyboardMarkup:
         """Pagination controls for long lists"""
         keyboard = []
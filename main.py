@@ -1,25 +1,48 @@
 #!/usr/bin/env python3
 # --- Стандартные библиотеки ---
+import argparse
 import asyncio
 import logging
 import os
 import sys
+import time
+from functools import partial
 # --- Сторонние библиотеки ---
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher, F
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Gifts
 # --- Внутренние модули ---
 from services.database import (
-    get_user_data, save_user_data, migrate_from_single_user,
-    get_owner_data, ensure_directories
+    get_user_data, update_user_data, migrate_from_single_user,
+    get_owner_data, ensure_directories, refresh_user_version
 )
 from services.localization import get_text, detect_language_from_user, get_target_display
 from services.menu import update_menu
 from services.balance import refresh_balance
-from services.gifts import get_filtered_gifts
+from services.gifts import get_filtered_gifts, fetch_available_gifts, install_available_gifts
+from services.history import catalog_history
+from services.poller import catalog_poller
+from services.drops import drop_detector, drop_tracker
 from services.buy import buy_gift
+from services.planner import plan_purchases, DEFAULT_OBJECTIVE
+from services.sharding import ShardPool, CatalogFeed
+from services.ipc import events
+from services.outbox import outbox
+from services.lease import LeaderLease
+from services.webhook import run_webhook
+from services.session import create_bot_session, keep_session_warm
+from services.timings import timings
+from services.metrics import metrics, gift_purchases, worker_tick_seconds, flood_waits, flood_wait_seconds
+from services.config import (
+    FSM_STORAGE_PATH, FSM_STATE_TTL, FSM_MAX_ENTRIES, CATALOG_SNIPER_MAX_AGE, HISTORY_INTERVAL,
+    WORKER_SHARDS, BOT_ROLE, IPC_SOCKET_PATH, WORKER_LOCK_PATH, WORKER_LEASE_RETRY,
+    WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_MAX_CONCURRENCY,
+    BOT_API_WARM_CONNECTIONS, BOT_API_WARM_INTERVAL, TIMINGS_REPORT_INTERVAL, METRICS_HOST, METRICS_PORT
+)
+from services.fsm_storage import SQLiteStorage
 from handlers.handlers_wizard import register_wizard_handlers
 from handlers.handlers_catalog import register_catalog_handlers
 from handlers.handlers_main import register_main_handlers
@@ -28,6 +51,7 @@ from handlers.settings import register_settings_handlers
 from utils.logging import setup_logging
 from middlewares.access_control import AccessControlMiddleware
 from middlewares.rate_limit import RateLimitMiddleware
+from middlewares.metrics import HandlerMetricsMiddleware
 
 load_dotenv()
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -42,8 +66,9 @@ MAX_PROFILES = int(os.getenv("MAX_PROFILES", "3"))
 setup_logging()
 logger = logging.getLogger(__name__)
 
-bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-dp = Dispatcher(storage=MemoryStorage())
+bot = Bot(token=TOKEN, session=create_bot_session(), default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+worker_lease = LeaderLease(WORKER_LOCK_PATH, retry_interval=WORKER_LEASE_RETRY)
+dp = Dispatcher(storage=SQLiteStorage(FSM_STORAGE_PATH, ttl=FSM_STATE_TTL, max_entries=FSM_MAX_ENTRIES))
 
 # Updated middleware for multi-user support
 from middlewares.commission import CommissionMiddleware
@@ -52,6 +77,8 @@ dp.message.middleware(RateLimitMiddleware(commands_limits={"/start": 3, "/withdr
 dp.message.middleware(AccessControlMiddleware(OWNER_ID))
 dp.message.middleware(CommissionMiddleware(OWNER_ID))
 dp.callback_query.middleware(AccessControlMiddleware(OWNER_ID))
+dp.message.middleware(HandlerMetricsMiddleware())
+dp.callback_query.middleware(HandlerMetricsMiddleware())
 
 register_wizard_handlers(dp)
 register_catalog_handlers(dp)
@@ -60,44 +87,203 @@ register_admin_handlers(dp)
 register_settings_handlers(dp)
 
 
-async def gift_purchase_worker():
+async def on_notify(user_id: int, text: str):
+    """Worker event: message to a user, sent by the bot UI process."""
+    outbox.notify(bot, user_id, text)
+
+async def on_user_updated(user_id: int):
+    """Worker event: user data changed, menus must not be served from cache."""
+    await refresh_user_version(user_id)
+
+async def on_timings(source: str, stages: dict):
+    """Worker event: stage timing histograms of a worker process, shown by /timings."""
+    timings.merge(source, stages)
+
+async def on_metrics(source: str, families: dict):
+    """Worker event: metric samples of a worker process, served on /metrics."""
+    metrics.merge(source, families)
+
+async def on_drop_seen(gift_id: str, price: int, supply: int, seen_at: float):
+    """Worker event: a new gift appeared in the catalog."""
+    drop_tracker.seen(gift_id, price, supply, seen_at)
+
+async def on_drop_sold_out(gift_id: str, at: float):
+    """Worker event: a tracked limited gift sold out."""
+    drop_tracker.sold_out(gift_id, at)
+
+async def on_drop_purchases(user_id: int, profile: int, planned: list):
+    """Worker event: planned and bought units of one profile's purchase pass."""
+    drop_tracker.purchases(user_id, profile, planned)
+
+async def on_catalog_stats(history: list, poll: dict):
+    """Worker event: sell-through rows and poll stats of the worker role, shown by the Sell-through Report."""
+    catalog_history.merge(history)
+    catalog_poller.merge(poll)
+
+events.on("notify", on_notify)
+events.on("user_updated", on_user_updated)
+events.on("timings", on_timings)
+events.on("metrics", on_metrics)
+events.on("drop_seen", on_drop_seen)
+events.on("drop_sold_out", on_drop_sold_out)
+events.on("drop_purchases", on_drop_purchases)
+events.on("catalog_stats", on_catalog_stats)
+
+
+async def process_users(shard: int = None, max_age: float = CATALOG_SNIPER_MAX_AGE):
+    """
+    One purchase pass over all active users (only users of `shard` in a shard process).
+    """
+    from services.database import get_all_users, is_user_blocked
+    
+    # Get all users
+    all_users = await get_all_users(shard, WORKER_SHARDS)
+    
+    for user_data in all_users:
+        user_id = user_data["user_id"]
+        
+        # Skip blocked users
+        if await is_user_blocked(user_id):
+            continue
+        
+        # Check if user has any active profiles
+        has_active_profiles = False
+        for profile in user_data.get("profiles", []):
+            if not profile.get("DONE", False):
+                has_active_profiles = True
+                break
+        
+        if not has_active_profiles:
+            continue
+        
+        # Process user's profiles
+        await process_user_profiles(user_id, user_data, max_age)
+
+async def gift_purchase_worker(shards: ShardPool = None):
     """
     Multi-user background worker for gift purchases.
-    Processes all active users and their profiles.
+    Processes all active users and their profiles, or with WORKER_SHARDS > 1
+    only polls the catalog and broadcasts it to the shard processes.
+    Poll cadence adapts to catalog activity (see services/poller.py).
     """
     while True:
         try:
-            from services.database import get_all_users, is_user_blocked
-            
-            # Get all users
-            all_users = await get_all_users()
-            
-            for user_data in all_users:
-                user_id = user_data["user_id"]
+            with timings.stage("worker_tick"), worker_tick_seconds.time():
+                # Fresh catalog for this tick; profiles reuse it from the cache
+                with timings.stage("catalog_fetch"):
+                    api_gifts = await fetch_available_gifts(bot, max_age=0)
                 
-                # Skip blocked users
-                if await is_user_blocked(user_id):
-                    continue
+                # Stamp new gifts before any purchase for them is reported
+                new_gifts, sold_out = drop_detector.scan(api_gifts)
+                for gift in new_gifts:
+                    await events.publish("drop_seen", **gift)
+                for gift_id in sold_out:
+                    await events.publish("drop_sold_out", gift_id=gift_id, at=time.time())
                 
-                # Check if user has any active profiles
-                has_active_profiles = False
-                for profile in user_data.get("profiles", []):
-                    if not profile.get("DONE", False):
-                        has_active_profiles = True
-                        break
-                
-                if not has_active_profiles:
-                    continue
-                
-                # Process user's profiles
-                await process_user_profiles(user_id, user_data)
+                if shards:
+                    shards.broadcast(api_gifts)
+                else:
+                    await process_users()
                 
+        except TelegramRetryAfter as e:
+            logger.error(f"Flood wait in gift_purchase_worker: {e.retry_after} s")
+            catalog_poller.flood_wait(e.retry_after)
+            flood_waits.inc("get_available_gifts")
+            flood_wait_seconds.inc("get_available_gifts", amount=e.retry_after)
         except Exception as e:
             logger.error(f"Error in gift_purchase_worker: {e}")
 
-        await asyncio.sleep(1)  # Check every second for all users
+        await asyncio.sleep(catalog_poller.next_delay())
+
+async def catalog_history_worker():
+    """
+    Background recorder of limited gift stock.
+    Shares the cached catalog with the purchase worker, so it adds no API calls while sniping.
+    """
+    while True:
+        try:
+            api_gifts = await fetch_available_gifts(bot, max_age=HISTORY_INTERVAL)
+            await catalog_history.record(api_gifts)
+        except Exception as e:
+            logger.error(f"Error in catalog_history_worker: {e}")
+
+        await asyncio.sleep(HISTORY_INTERVAL)
+
+async def drop_tracker_worker():
+    """Background task of the bot UI process: closes and stores drops older than DROP_WINDOW."""
+    while True:
+        await asyncio.sleep(30)
+        try:
+            await drop_tracker.close_expired()
+        except Exception as e:
+            logger.error(f"Error in drop_tracker_worker: {e}")
+
+async def report_stats(source: str, catalog: bool = False):
+    """
+    Background task of worker processes: sends stage timings and metrics to the bot UI process.
+    
+    :param catalog: Отправлять ли также продажи из истории каталога и статистику опроса (процесс-поллер).
+    """
+    while True:
+        await asyncio.sleep(TIMINGS_REPORT_INTERVAL)
+        if timings.enabled:
+            await events.publish("timings", source=source, stages=timings.export())
+        if metrics.enabled:
+            await events.publish("metrics", source=source, families=metrics.export())
+        if catalog:
+            await events.publish(
+                "catalog_stats", history=catalog_history.report(limit=10), poll=catalog_poller.stats()
+            )
 
-async def process_user_profiles(user_id: int, user_data: dict):
+async def shard_worker(index: int, conn):
+    """Purchase pass of one shard for every catalog broadcast by the poller process."""
+    feed = CatalogFeed(conn)
+    logger.info(f"Purchase shard {index + 1}/{WORKER_SHARDS} started")
+    warm_task = None
+    if BOT_API_WARM_CONNECTIONS > 0:
+        warm_task = asyncio.create_task(keep_session_warm(bot, BOT_API_WARM_CONNECTIONS, BOT_API_WARM_INTERVAL))
+    stats_task = None
+    if timings.enabled or metrics.enabled:
+        stats_task = asyncio.create_task(report_stats(f"shard {index + 1}"))
+    try:
+        while True:
+            payload = await feed.next()
+            if payload is None:
+                break
+            try:
+                install_available_gifts(Gifts.model_validate(payload))
+                # Never fetch from a shard: the poller process owns catalog requests
+                with worker_tick_seconds.time():
+                    await process_users(index, max_age=float("inf"))
+            except Exception as e:
+                logger.error(f"Error in purchase shard {index + 1}: {e}")
+    finally:
+        if warm_task:
+            warm_task.cancel()
+        if stats_task:
+            stats_task.cancel()
+        await bot.session.close()
+
+def run_shard(index: int, conn):
+    """Entry point of a purchase shard process (see services/sharding.py)."""
+    events.connect(IPC_SOCKET_PATH)
+    asyncio.run(shard_worker(index, conn))
+
+def _count_purchase(data: dict, profile_index: int, price: int):
+    """update_user_data step: one gift bought for the profile"""
+    profiles = data.get("profiles", [])
+    if profile_index < len(profiles):
+        profile = profiles[profile_index]
+        profile["BOUGHT"] = profile.get("BOUGHT", 0) + 1
+        profile["SPENT"] = profile.get("SPENT", 0) + price
+
+def _mark_profile_done(data: dict, profile_index: int):
+    """update_user_data step: the profile reached its COUNT or LIMIT"""
+    profiles = data.get("profiles", [])
+    if profile_index < len(profiles):
+        profiles[profile_index]["DONE"] = True
+
+async def process_user_profiles(user_id: int, user_data: dict, max_age: float = CATALOG_SNIPER_MAX_AGE):
     """Process gift purchases for a specific user's profiles"""
     try:
         # Refresh user balance
@@ -123,11 +309,14 @@ async def process_user_profiles(user_id: int, user_data: dict):
             LIMIT = profile.get("LIMIT", 1000000)
             TARGET_USER_ID = profile.get("TARGET_USER_ID")
             TARGET_CHAT_ID = profile.get("TARGET_CHAT_ID")
+            OBJECTIVE = profile.get("OBJECTIVE", DEFAULT_OBJECTIVE)
             
             # Get filtered gifts
-            filtered_gifts = await get_filtered_gifts(
-                bot, MIN_PRICE, MAX_PRICE, MIN_SUPPLY, MAX_SUPPLY
-            )
+            with timings.stage("matching"):
+                filtered_gifts = await get_filtered_gifts(
+                    bot, MIN_PRICE, MAX_PRICE, MIN_SUPPLY, MAX_SUPPLY,
+                    max_age=max_age
+                )
             
             if not filtered_gifts:
                 continue
@@ -136,48 +325,63 @@ async def process_user_profiles(user_id: int, user_data: dict):
             before_bought = profile.get("BOUGHT", 0)
             before_spent = profile.get("SPENT", 0)
             
-            # Try to buy gifts
-            for gift in filtered_gifts:
+            # Plan purchases within COUNT, LIMIT and balance, then buy
+            with timings.stage("planning"):
+                plan = plan_purchases(
+                    filtered_gifts,
+                    count=COUNT - before_bought,
+                    budget=min(LIMIT - before_spent, user_data["balance"]),
+                    objective=OBJECTIVE
+                )
+            
+            drop_results = []  # [gift_id, planned, bought, first purchase at] for drop tracking
+            for gift, quantity in plan:
                 gift_id = gift["id"]
                 gift_price = gift["price"]
                 sticker_file_id = gift["sticker_file_id"]
+                drop_result = [gift_id, quantity, 0, None]
+                drop_results.append(drop_result)
                 
-                # Check limits before purchase
-                while (profile.get("BOUGHT", 0) < COUNT and 
-                       profile.get("SPENT", 0) + gift_price <= LIMIT and
-                       user_data["balance"] >= gift_price):
-                    
-                    success = await buy_gift(
-                        bot=bot,
-                        env_user_id=user_id,
-                        gift_id=gift_id,
-                        user_id=TARGET_USER_ID,
-                        chat_id=TARGET_CHAT_ID,
-                        gift_price=gift_price,
-                        file_id=sticker_file_id
-                    )
+                for _ in range(quantity):
+                    with timings.stage("buy_gift"):
+                        success = await buy_gift(
+                            bot=bot,
+                            env_user_id=user_id,
+                            gift_id=gift_id,
+                            user_id=TARGET_USER_ID,
+                            chat_id=TARGET_CHAT_ID,
+                            gift_price=gift_price,
+                            file_id=sticker_file_id
+                        )
                     
+                    gift_purchases.inc(gift_id, "attempted")
                     if not success:
+                        gift_purchases.inc(gift_id, "failed")
                         break
+                    gift_purchases.inc(gift_id, "succeeded")
+                    drop_result[2] += 1
+                    if drop_result[3] is None:
+                        drop_result[3] = time.time()
                     
-                    # Update profile and user data
+                    # Update profile; buy_gift already charged the balance
                     profile["BOUGHT"] = profile.get("BOUGHT", 0) + 1
                     profile["SPENT"] = profile.get("SPENT", 0) + gift_price
-                    user_data["balance"] -= gift_price
-                    user_data["total_spent"] = user_data.get("total_spent", 0) + gift_price
                     
                     purchases.append({"id": gift_id, "price": gift_price})
                     
-                    # Save updated data
-                    await save_user_data(user_id, user_data)
+                    # Merge into the stored record: a deposit may have been credited meanwhile
+                    with timings.stage("save_user"):
+                        fresh = await update_user_data(
+                            user_id, partial(_count_purchase, profile_index=profile_index, price=gift_price)
+                        )
+                    user_data["balance"] = fresh["balance"]
+                    user_data["total_spent"] = fresh.get("total_spent", 0)
                     await asyncio.sleep(PURCHASE_COOLDOWN)
-                    
-                    # Check if limits reached
-                    if profile["SPENT"] >= LIMIT:
-                        break
-                
-                if profile.get("BOUGHT", 0) >= COUNT or profile.get("SPENT", 0) >= LIMIT:
-                    break
+            
+            if drop_results:
+                await events.publish(
+                    "drop_purchases", user_id=user_id, profile=profile_index, planned=drop_results
+                )
             
             # Check if profile is completed
             after_bought = profile.get("BOUGHT", 0)
@@ -185,19 +389,15 @@ async def process_user_profiles(user_id: int, user_data: dict):
             
             if (after_bought >= COUNT or after_spent >= LIMIT) and not profile.get("DONE", False):
                 profile["DONE"] = True
-                await save_user_data(user_id, user_data)
+                await update_user_data(user_id, partial(_mark_profile_done, profile_index=profile_index))
                 
                 # Get user language for notifications
                 user_language = user_data.get("language", "en")
                 target_display = get_target_display(profile, user_id, user_language)
                 
-                # Send completion notification
+                # Send completion notification (through the bot UI process)
                 completion_text = await get_text(user_id, "purchase_complete")
-                
-                try:
-                    await bot.send_message(user_id, completion_text)
-                except Exception as e:
-                    logger.error(f"Failed to send completion notification to {user_id}: {e}")
+                await events.publish("notify", user_id=user_id, text=completion_text)
                 
                 progress_made = True
                 logger.info(f"Profile #{profile_index+1} completed for user {user_id}")
@@ -206,20 +406,51 @@ async def process_user_profiles(user_id: int, user_data: dict):
                 progress_made = True
                 logger.info(f"Progress made on profile #{profile_index+1} for user {user_id}")
         
-        # Update user data if progress was made
+        # Changes are already saved; let the bot UI process drop cached menus
         if progress_made:
-            await save_user_data(user_id, user_data)
+            await events.publish("user_updated", user_id=user_id)
             
     except Exception as e:
         logger.error(f"Error processing profiles for user {user_id}: {e}")
 
 
-async def main() -> None:
+async def run_purchase_role():
+    """
+    Purchase side of the bot: waits for the worker lease (another instance may hold it
+    during a deploy), then polls the catalog, buys and records history.
+    """
+    await worker_lease.acquire()
+    
+    # Restore catalog history for sell-through estimates
+    catalog_history.load()
+    
+    shards = None
+    if WORKER_SHARDS > 1:
+        shards = ShardPool(run_shard, WORKER_SHARDS)
+        shards.start()
+    workers = [gift_purchase_worker(shards), catalog_history_worker()]
+    if BOT_API_WARM_CONNECTIONS > 0:
+        # Purchases go out of this process only without shards; shards warm their own sessions
+        workers.append(keep_session_warm(bot, 1 if shards else BOT_API_WARM_CONNECTIONS, BOT_API_WARM_INTERVAL))
+    if events.connected:
+        # A separate worker role reports its timings, metrics and catalog stats to the bot UI process
+        workers.append(report_stats("worker", catalog=True))
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        if shards:
+            shards.stop()
+        worker_lease.release()
+
+
+async def main(role: str = "all") -> None:
     """
     Entry point: initialization, migration, and start polling.
     Multi-user system with commission support.
+    
+    :param role: "ui" — bot updates only, "worker" — purchases only, "all" — both.
     """
-    logger.info("Multi-user TelegramGiftsBot v2.0.0 started!")
+    logger.info(f"Multi-user TelegramGiftsBot v2.0.0 started! Role: {role}")
     
     # Ensure directories exist
     await ensure_directories()
@@ -235,12 +466,64 @@ async def main() -> None:
     # Create owner user profile if not exists
     await get_user_data(OWNER_ID)
     
-    # Start background worker
-    asyncio.create_task(gift_purchase_worker())
+    # Worker events: the ui role listens for other processes, a separate worker sends to it
+    ipc_server = None
+    if role == "ui" or (role == "all" and WORKER_SHARDS > 1):
+        ipc_server = await events.serve(IPC_SOCKET_PATH)
+    elif role == "worker":
+        events.connect(IPC_SOCKET_PATH)
+    
+    # Metrics endpoint, also serving samples reported by worker processes
+    metrics_runner = None
+    if METRICS_PORT and role != "worker":
+        metrics_runner = await metrics.serve(METRICS_HOST, METRICS_PORT)
     
-    # Start polling
-    await dp.start_polling(bot)
+    # Drop SLO tracking lives next to the admin report; workers send it events
+    drop_task = None
+    if role != "worker":
+        drop_tracker.load()
+        drop_task = asyncio.create_task(drop_tracker_worker())
+    
+    # Start background workers
+    purchase_task = None
+    if role in ("all", "worker"):
+        purchase_task = asyncio.create_task(run_purchase_role())
+    
+    try:
+        if role == "worker":
+            await purchase_task
+        elif WEBHOOK_URL:
+            await run_webhook(
+                dp, bot, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET,
+                WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_MAX_CONCURRENCY
+            )
+        else:
+            # Start polling (a webhook left by webhook mode would block getUpdates)
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        if purchase_task:
+            purchase_task.cancel()
+        if ipc_server:
+            ipc_server.close()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        if drop_task:
+            # Drops still inside DROP_WINDOW would be lost with the process
+            try:
+                await drop_tracker.close_all()
+            except Exception as e:
+                logger.error(f"Failed to store open drops: {e}")
+            drop_task.cancel()
+        if role == "worker":
+            await bot.session.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TelegramGiftsBot")
+    parser.add_argument(
+        "--role", choices=("all", "ui", "worker"), default=BOT_ROLE,
+        help="ui — bot updates, worker — gift purchases, all — both in one process"
+    )
+    args = parser.parse_args()
     logging.basicConfig(level=logging.INFO, stream=sys.stdout)
-    asyncio.run(main())
+    asyncio.run(main(args.role))
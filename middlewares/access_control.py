@@ -16,7 +16,7 @@ class AccessControlMiddleware(BaseMiddleware):
     FREE_STATES = {"ConfigWizard:guest_deposit_amount", "ConfigWizard:guest_refund_id"}
     ADMIN_CALLBACKS = {"admin_panel", "withdraw_commission", "detailed_report", 
                       "change_commission_rate", "manage_users", "block_user_prompt", 
-                      "unblock_user_prompt", "user_list"}
+                      "unblock_user_prompt", "user_list", "sellout_report", "drop_report"}
 
     def __init__(self, owner_id: int):
         """
@@ -0,0 +1,27 @@
+# --- Стандартные библиотеки ---
+import time
+
+# --- Сторонние библиотеки ---
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+# --- Внутренние модули ---
+from services.metrics import metrics, handler_seconds
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Records update handling latency per handler (tgbot_handler_seconds).
+    Registered as inner middleware, so it runs after filters and knows the matched handler.
+    """
+
+    async def __call__(self, handler, event: TelegramObject, data: dict):
+        if not metrics.enabled:
+            return await handler(event, data)
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            handler_seconds.observe(time.perf_counter() - start, name)
@@ -7,8 +7,10 @@ import random
 from aiogram.exceptions import TelegramAPIError, TelegramNetworkError, TelegramRetryAfter
 
 # --- Внутренние модули ---
-from services.database import get_user_data, save_user_data, update_user_balance, get_owner_data, save_owner_data
+from services.database import get_user_data, save_user_data, update_user_balance, get_owner_data, update_owner_data
 from services.config import DEV_MODE
+from services.timings import timings
+from services.metrics import send_gift_seconds, flood_waits, flood_wait_seconds
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -33,28 +35,33 @@ async def transfer_admin_share_from_gift(gift_price: int, buyer_user_id: int):
             return
         
         # إضافة المبلغ مباشرة إلى رصيد الأدمن (كمستخدم عادي)
-        await update_user_balance(admin_user_id, admin_share)
+        with timings.stage("admin_share_balance"):
+            await update_user_balance(admin_user_id, admin_share)
         
-        # تحديث إحصائيات الهدايا
-        owner_data["total_stars_spent_on_gifts"] = owner_data.get("total_stars_spent_on_gifts", 0) + gift_price
-        owner_data["total_gifts_purchased"] = owner_data.get("total_gifts_purchased", 0) + 1
-        owner_data["last_gift_purchase"] = datetime.now().isoformat()
-        
-        # تحديث إجمالي المبالغ المحولة للأدمن
-        owner_data["total_admin_share_earned"] = owner_data.get("total_admin_share_earned", 0) + admin_share
+        def update_stats(owner_data):
+            # تحديث إحصائيات الهدايا
+            owner_data["total_stars_spent_on_gifts"] = owner_data.get("total_stars_spent_on_gifts", 0) + gift_price
+            owner_data["total_gifts_purchased"] = owner_data.get("total_gifts_purchased", 0) + 1
+            owner_data["last_gift_purchase"] = datetime.now().isoformat()
+            
+            # تحديث إجمالي المبالغ المحولة للأدمن
+            owner_data["total_admin_share_earned"] = owner_data.get("total_admin_share_earned", 0) + admin_share
         
-        await save_owner_data(owner_data)
+        # Locked read-modify-write: the bot UI process credits deposits to the same file
+        with timings.stage("admin_share_owner_save"):
+            await update_owner_data(update_stats)
         
         # تسجيل العملية
         from services.database import log_transaction
-        await log_transaction("admin_share_from_gift", {
-            "gift_price": gift_price,
-            "admin_share": admin_share,
-            "admin_share_rate": admin_share_rate,
-            "buyer_user_id": buyer_user_id,
-            "admin_user_id": admin_user_id,
-            "timestamp": datetime.now().isoformat()
-        })
+        with timings.stage("log_transaction"):
+            await log_transaction("admin_share_from_gift", {
+                "gift_price": gift_price,
+                "admin_share": admin_share,
+                "admin_share_rate": admin_share_rate,
+                "buyer_user_id": buyer_user_id,
+                "admin_user_id": admin_user_id,
+                "timestamp": datetime.now().isoformat()
+            })
         
         logger.info(f"Admin share transferred: {admin_share} stars (10% of {gift_price}) → Admin balance")
         
@@ -105,17 +112,21 @@ async def buy_gift(
     for attempt in range(1, retries + 1):
         try:
             if user_id is not None and chat_id is None:
-                result = await bot.send_gift(gift_id=gift_id, user_id=user_id)
+                with timings.stage("send_gift"), send_gift_seconds.time():
+                    result = await bot.send_gift(gift_id=gift_id, user_id=user_id)
             elif user_id is None and chat_id is not None:
-                result = await bot.send_gift(gift_id=gift_id, chat_id=chat_id)
+                with timings.stage("send_gift"), send_gift_seconds.time():
+                    result = await bot.send_gift(gift_id=gift_id, chat_id=chat_id)
             else:
                 break
 
             if result:
-                new_balance = await update_user_balance(env_user_id, -gift_price)
+                with timings.stage("balance_update"):
+                    new_balance = await update_user_balance(env_user_id, -gift_price)
                 
                 # CRITICAL: تحويل 10% من سعر الهدية تلقائياً لرصيد الأدمن
-                await transfer_admin_share_from_gift(gift_price, env_user_id)
+                with timings.stage("admin_share"):
+                    await transfer_admin_share_from_gift(gift_price, env_user_id)
                 
                 logger.info(f"Successful gift purchase {gift_id} for {gift_price} stars. Remaining: {new_balance}")
                 return True
@@ -124,6 +135,8 @@ async def buy_gift(
 
         except TelegramRetryAfter as e:
             logger.error(f"Flood wait: ждём {e.retry_after} секунд")
+            flood_waits.inc("send_gift")
+            flood_wait_seconds.inc("send_gift", amount=e.retry_after)
             await asyncio.sleep(e.retry_after)
 
         except TelegramNetworkError as e:
@@ -19,6 +19,48 @@ CONFIG_PATH = "config.json"
 DEV_MODE = os.getenv("DEV_MODE", "false").lower() == "true"  # Test gift purchases
 MAX_PROFILES = int(os.getenv("MAX_PROFILES", "3"))  # Maximum profiles per user
 PURCHASE_COOLDOWN = float(os.getenv("PURCHASE_COOLDOWN", "0.3"))  # Purchases per second
+MENU_EDIT_IN_PLACE = os.getenv("MENU_EDIT_IN_PLACE", "true").lower() == "true"  # Edit menu instead of delete + send
+MENU_DEBOUNCE_WINDOW = float(os.getenv("MENU_DEBOUNCE_WINDOW", "0.1"))  # Seconds to coalesce menu refreshes per chat
+FSM_STORAGE_PATH = os.getenv("FSM_STORAGE_PATH", "fsm.sqlite3")  # SQLite file with FSM states
+FSM_STATE_TTL = float(os.getenv("FSM_STATE_TTL", "86400"))  # Seconds before an idle FSM state expires
+FSM_MAX_ENTRIES = int(os.getenv("FSM_MAX_ENTRIES", "10000"))  # Maximum stored FSM states
+CATALOG_UI_MAX_AGE = float(os.getenv("CATALOG_UI_MAX_AGE", "5"))  # Seconds a cached gift catalog is fresh enough for the store
+CATALOG_SNIPER_MAX_AGE = float(os.getenv("CATALOG_SNIPER_MAX_AGE", "0.5"))  # Same for the purchase worker
+WORKER_SHARDS = int(os.getenv("WORKER_SHARDS", "1"))  # Purchase worker processes (users split by user_id)
+BOT_ROLE = os.getenv("BOT_ROLE", "all")  # Default --role of main.py: all, ui or worker
+IPC_SOCKET_PATH = os.getenv("IPC_SOCKET_PATH", "bot.sock")  # Unix socket for worker -> UI events
+WORKER_LOCK_PATH = os.getenv("WORKER_LOCK_PATH", "worker.lock")  # Lock file: one purchase worker per data directory
+WORKER_LEASE_RETRY = float(os.getenv("WORKER_LEASE_RETRY", "1"))  # Seconds between takeover attempts of a standby worker
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # Public HTTPS base URL; empty — long polling
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")  # Path of the webhook endpoint
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # secret_token checked on every webhook request; empty — random per run
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")  # Address of the embedded webhook server
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))  # Port of the embedded webhook server
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "64"))  # Updates processed at once
+BOT_API_URL = os.getenv("BOT_API_URL", "")  # Bot API server base URL; empty — api.telegram.org
+BOT_API_POOL_SIZE = int(os.getenv("BOT_API_POOL_SIZE", "100"))  # Bot API connection pool size
+BOT_API_POOL_PER_HOST = int(os.getenv("BOT_API_POOL_PER_HOST", "0"))  # Connections per host (0 — pool size)
+BOT_API_KEEPALIVE = float(os.getenv("BOT_API_KEEPALIVE", "60"))  # Seconds an idle Bot API connection stays open
+BOT_API_DNS_TTL = int(os.getenv("BOT_API_DNS_TTL", "3600"))  # Seconds DNS answers are cached
+BOT_API_TIMEOUT = float(os.getenv("BOT_API_TIMEOUT", "30"))  # Bot API request timeout
+BOT_API_WARM_CONNECTIONS = int(os.getenv("BOT_API_WARM_CONNECTIONS", "4"))  # Connections kept open by the worker
+BOT_API_WARM_INTERVAL = float(os.getenv("BOT_API_WARM_INTERVAL", "20"))  # Seconds between re-warms (< keep-alive)
+OUTBOX_CHAT_INTERVAL = float(os.getenv("OUTBOX_CHAT_INTERVAL", "1"))  # Min seconds between bot messages to one chat
+OUTBOX_GLOBAL_RATE = float(os.getenv("OUTBOX_GLOBAL_RATE", "30"))  # Max bot messages per second overall
+OWNER_DIGEST_WINDOW = float(os.getenv("OWNER_DIGEST_WINDOW", "0"))  # Seconds owner notices are summed up (0 — each at once)
+OWNER_ALERT_THRESHOLD = int(os.getenv("OWNER_ALERT_THRESHOLD", "0"))  # Commission/donation sent at once from this amount (0 — never)
+HISTORY_PATH = os.getenv("HISTORY_PATH", "catalog_history.jsonl")  # Append-only log of limited gift stock
+HISTORY_INTERVAL = float(os.getenv("HISTORY_INTERVAL", "5"))  # Seconds between catalog history samples
+HISTORY_WINDOW = float(os.getenv("HISTORY_WINDOW", "600"))  # Seconds of history used for sell-through velocity
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "0.5"))  # Seconds between catalog polls during a drop
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "8"))  # Longest idle backoff between catalog polls
+POLL_HOT_WINDOW = float(os.getenv("POLL_HOT_WINDOW", "60"))  # Seconds of fast polling after a catalog change
+TIMINGS_ENABLED = os.getenv("TIMINGS_ENABLED", "false").lower() == "true"  # Time purchase-path stages (/timings)
+TIMINGS_REPORT_INTERVAL = float(os.getenv("TIMINGS_REPORT_INTERVAL", "10"))  # Seconds between timing/metrics/catalog stats reports of worker processes
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # Address of the metrics endpoint
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Port of the OpenMetrics endpoint /metrics (0 — off)
+DROPS_PATH = os.getenv("DROPS_PATH", "drops.jsonl")  # Log of new gift drops with purchase latency and fill rate
+DROP_WINDOW = float(os.getenv("DROP_WINDOW", "600"))  # Seconds a drop is tracked after it appeared
 
 def DEFAULT_PROFILE(user_id: int) -> dict:
     """Создаёт профиль с дефолтными настройками для указанного пользователя."""
@@ -33,7 +75,8 @@ def DEFAULT_PROFILE(user_id: int) -> dict:
         "TARGET_CHAT_ID": None,
         "BOUGHT": 0,
         "SPENT": 0,
-        "DONE": False
+        "DONE": False,
+        "OBJECTIVE": "spend"
     }
 
 def DEFAULT_CONFIG(user_id: int) -> dict:
@@ -58,6 +101,7 @@ PROFILE_TYPES = {
     "BOUGHT": (int, False),
     "SPENT": (int, False),
     "DONE": (bool, False),
+    "OBJECTIVE": (str, False),
 }
 
 # Типы и требования для глобальных полей
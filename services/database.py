@@ -1,10 +1,21 @@
+import asyncio
 import json
 import os
 import logging
+import tempfile
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Callable, Optional, Dict, List
 import aiofiles
 
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks
+    fcntl = None
+
+from services.sharding import shard_of
+from services.metrics import storage_seconds
+
 logger = logging.getLogger(__name__)
 
 # Get optional environment variables - FIXED TO 10%
@@ -22,57 +33,165 @@ DEFAULT_USER_PROFILE = {
     "TARGET_CHAT_ID": None,
     "BOUGHT": 0,
     "SPENT": 0,
-    "DONE": False
+    "DONE": False,
+    "OBJECTIVE": "spend"
 }
 
+# In-memory data versions consumed by render caches (see services/menu.py).
+# A user's version changes only when fields visible in the menu change,
+# the global epoch changes on any such user change or owner data save.
+_user_versions: Dict[int, int] = {}
+_user_fingerprints: Dict[int, str] = {}
+_owner_fingerprint: Optional[str] = None
+_user_languages: Dict[int, str] = {}
+_data_epoch = 0
+
+# Writers of one data file inside this process (see _file_lock)
+_file_locks: Dict[str, asyncio.Lock] = {}
+
+PAYMENT_CHARGES_KEPT = 100  # Recent telegram_payment_charge_id per user kept for deduplication
+
+def _menu_fingerprint(data: Dict) -> str:
+    """Serialize the user fields that affect the rendered menu"""
+    return json.dumps(
+        [data.get("balance"), data.get("active"), data.get("language"), data.get("profiles")],
+        sort_keys=True, ensure_ascii=False
+    )
+
+def _touch_user_version(user_id: int, data: Dict):
+    """Bump the user's data version if menu-relevant fields changed"""
+    global _data_epoch
+    _user_languages[user_id] = data.get("language", "en")
+    fingerprint = _menu_fingerprint(data)
+    if _user_fingerprints.get(user_id) != fingerprint:
+        _user_fingerprints[user_id] = fingerprint
+        _user_versions[user_id] = _user_versions.get(user_id, 0) + 1
+        _data_epoch += 1
+
+def get_user_version(user_id: int) -> int:
+    """Current in-memory data version of a user (0 if never saved in this process)"""
+    return _user_versions.get(user_id, 0)
+
+def get_data_epoch() -> int:
+    """Global data version, bumped by any user or owner data change"""
+    return _data_epoch
+
+def get_cached_language(user_id: int) -> Optional[str]:
+    """Language of a user seen by this process, None if unknown (no I/O)"""
+    return _user_languages.get(user_id)
+
 async def ensure_directories():
     """Ensure required directories exist with proper Linux permissions"""
     os.makedirs("users", mode=0o755, exist_ok=True)
     os.makedirs("logs", mode=0o755, exist_ok=True)
 
+def _new_user_data(user_id: int) -> Dict:
+    """Record of a user seen for the first time"""
+    default_profile = DEFAULT_USER_PROFILE.copy()
+    default_profile["TARGET_USER_ID"] = user_id
+    
+    return {
+        "user_id": user_id,
+        "balance": 0,
+        "total_deposited": 0,
+        "total_spent": 0,
+        "language": "en",  # Default language - English
+        "profiles": [default_profile],
+        "created_at": datetime.now().isoformat(),
+        "last_active": datetime.now().isoformat(),
+        "is_blocked": False,
+        "total_purchases": 0
+    }
+
+async def update_user_data(user_id: int, update: Callable[[Dict], None]) -> Dict:
+    """
+    Read-modify-write of a user record under its file lock, so writers in any process
+    (bot UI, worker, shards) never overwrite each other's changes. `update` changes the
+    fresh record in place; the saved record is returned. Creates the user if missing
+    """
+    await ensure_directories()
+    path = f"users/{user_id}.json"
+    async with _file_lock(path):
+        try:
+            with storage_seconds.time("read", "user"):
+                async with aiofiles.open(path, "r", encoding="utf-8") as f:
+                    data = json.loads(await f.read())
+        except FileNotFoundError:
+            data = _new_user_data(user_id)
+            logger.info(f"Created new user: {user_id}")
+        update(data)
+        _touch_user_version(user_id, data)
+        with storage_seconds.time("write", "user"):
+            await _write_json(path, data)
+    return data
+
 async def get_user_data(user_id: int) -> Dict:
     """Get user data, create if doesn't exist"""
-    await ensure_directories()
+    def touch(data: Dict):
+        data["last_active"] = datetime.now().isoformat()
     
+    return await update_user_data(user_id, touch)
+
+async def refresh_user_version(user_id: int):
+    """Re-reads a user file saved by another process (purchase worker) so render caches see it"""
     try:
         async with aiofiles.open(f"users/{user_id}.json", "r", encoding="utf-8") as f:
             data = json.loads(await f.read())
-            # Update last_active
-            data["last_active"] = datetime.now().isoformat()
-            await save_user_data(user_id, data)
-            return data
-    except FileNotFoundError:
-        # Create new user
-        default_profile = DEFAULT_USER_PROFILE.copy()
-        default_profile["TARGET_USER_ID"] = user_id
-        
-        default_data = {
-            "user_id": user_id,
-            "balance": 0,
-            "total_deposited": 0,
-            "total_spent": 0,
-            "language": "en",  # Default language - English
-            "profiles": [default_profile],
-            "created_at": datetime.now().isoformat(),
-            "last_active": datetime.now().isoformat(),
-            "is_blocked": False,
-            "total_purchases": 0
-        }
-        await save_user_data(user_id, default_data)
-        logger.info(f"Created new user: {user_id}")
-        return default_data
+    except (FileNotFoundError, ValueError):
+        return
+    _touch_user_version(user_id, data)
+
+@asynccontextmanager
+async def _file_lock(path: str):
+    """
+    Exclusive access to a data file: an asyncio lock for tasks of this process and
+    an fcntl.flock on `path + ".lock"` for other processes (worker role, shards)
+    """
+    async with _file_locks.setdefault(path, asyncio.Lock()):
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Held by another process: wait without blocking the event loop
+                await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # releases the flock
+
+async def _write_json(path: str, data: Dict):
+    """
+    Write JSON to a temp file of its own and swap it in, so a crash never leaves a
+    half-written file. The caller holds _file_lock(path)
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        async with aiofiles.open(tmp_path, "w", encoding="utf-8") as f:
+            await f.write(json.dumps(data, indent=2, ensure_ascii=False))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
 async def save_user_data(user_id: int, data: Dict):
     """Save user data to file"""
     await ensure_directories()
-    async with aiofiles.open(f"users/{user_id}.json", "w", encoding="utf-8") as f:
-        await f.write(json.dumps(data, indent=2, ensure_ascii=False))
+    _touch_user_version(user_id, data)
+    path = f"users/{user_id}.json"
+    with storage_seconds.time("write", "user"):
+        async with _file_lock(path):
+            await _write_json(path, data)
 
 async def get_owner_data() -> Dict:
     """Get owner commission data"""
     try:
-        async with aiofiles.open("owner_data.json", "r", encoding="utf-8") as f:
-            return json.loads(await f.read())
+        with storage_seconds.time("read", "owner"):
+            async with aiofiles.open("owner_data.json", "r", encoding="utf-8") as f:
+                return json.loads(await f.read())
     except FileNotFoundError:
         # Get owner ID from environment
         owner_id = int(os.getenv("TELEGRAM_USER_ID"))
@@ -90,10 +209,33 @@ async def get_owner_data() -> Dict:
         await save_owner_data(default_data)
         return default_data
 
+def _touch_owner_version(data: Dict):
+    """Bump the global epoch if owner data changed"""
+    global _data_epoch, _owner_fingerprint
+    fingerprint = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    if fingerprint != _owner_fingerprint:
+        _owner_fingerprint = fingerprint
+        _data_epoch += 1
+
 async def save_owner_data(data: Dict):
     """Save owner data"""
-    async with aiofiles.open("owner_data.json", "w", encoding="utf-8") as f:
-        await f.write(json.dumps(data, indent=2, ensure_ascii=False))
+    _touch_owner_version(data)
+    with storage_seconds.time("write", "owner"):
+        async with _file_lock("owner_data.json"):
+            await _write_json("owner_data.json", data)
+
+async def update_owner_data(update: Callable[[Dict], None]) -> Dict:
+    """Read-modify-write of owner data under its file lock (see update_user_data)"""
+    await get_owner_data()  # creates the file if missing
+    async with _file_lock("owner_data.json"):
+        with storage_seconds.time("read", "owner"):
+            async with aiofiles.open("owner_data.json", "r", encoding="utf-8") as f:
+                data = json.loads(await f.read())
+        update(data)
+        _touch_owner_version(data)
+        with storage_seconds.time("write", "owner"):
+            await _write_json("owner_data.json", data)
+    return data
 
 async def add_commission(amount: int, user_id: int) -> int:
     """Add commission to owner balance"""
@@ -113,6 +255,63 @@ async def add_commission(amount: int, user_id: int) -> int:
     await save_owner_data(owner_data)
     return owner_data["commission_balance"]
 
+async def process_deposit(user_id: int, charge_id: str, total_amount: int) -> Optional[Dict]:
+    """
+    Credit a paid deposit: user balance and owner commission in one step.
+    Returns None if this telegram_payment_charge_id was already credited (re-delivered update).
+    
+    Both records are changed by locked read-modify-writes (update_user_data/update_owner_data),
+    so a worker saving the same user from another process can't undo the credit. The charge
+    id is stored with the user's balance, which is written first, so a retry after a crash
+    can never credit the user twice; the audit entry is logged once both records are saved.
+    """
+    owner_data = await get_owner_data()
+    commission_rate = owner_data.get("commission_rate", DEFAULT_COMMISSION_RATE)
+    commission = int(total_amount * commission_rate)
+    user_amount = total_amount - commission
+    credited = False
+    
+    def credit_user(data: Dict):
+        nonlocal credited
+        charges = data.setdefault("payment_charges", [])
+        if charge_id in charges:
+            return
+        data["balance"] += user_amount
+        data["total_deposited"] += user_amount
+        charges.append(charge_id)
+        del charges[:-PAYMENT_CHARGES_KEPT]
+        credited = True
+    
+    def credit_owner(data: Dict):
+        data["commission_balance"] += commission
+        data["total_commissions_earned"] += commission
+        data["total_deposits_processed"] += total_amount
+    
+    user_data = await update_user_data(user_id, credit_user)
+    if not credited:
+        logger.warning(f"Duplicate payment {charge_id} from user {user_id} ignored")
+        return None
+    owner_data = await update_owner_data(credit_owner)
+    
+    # One audit entry for the whole deposit
+    await log_transaction("deposit", {
+        "charge_id": charge_id,
+        "user_id": user_id,
+        "amount": total_amount,
+        "user_amount": user_amount,
+        "commission": commission,
+        "commission_rate": commission_rate
+    })
+    
+    return {
+        "owner_id": owner_data.get("owner_id"),
+        "commission_rate": commission_rate,
+        "commission": commission,
+        "user_amount": user_amount,
+        "balance": user_data["balance"],
+        "commission_balance": owner_data["commission_balance"]
+    }
+
 async def withdraw_commission(amount: int) -> bool:
     """Withdraw commission from owner balance"""
     owner_data = await get_owner_data()
@@ -132,14 +331,18 @@ async def withdraw_commission(amount: int) -> bool:
 
 async def update_user_balance(user_id: int, amount: int) -> int:
     """Update user balance and return new balance"""
-    user_data = await get_user_data(user_id)
-    old_balance = user_data["balance"]
-    user_data["balance"] = max(0, user_data["balance"] + amount)
-    if amount > 0:
-        user_data["total_deposited"] += amount
-    else:
-        user_data["total_spent"] += abs(amount)
-    await save_user_data(user_id, user_data)
+    old_balance = None
+    
+    def apply(data: Dict):
+        nonlocal old_balance
+        old_balance = data["balance"]
+        data["balance"] = max(0, data["balance"] + amount)
+        if amount > 0:
+            data["total_deposited"] += amount
+        else:
+            data["total_spent"] += abs(amount)
+    
+    user_data = await update_user_data(user_id, apply)
     
     # DEBUG: Log only withdrawals (negative amounts) for debugging
     if amount < 0:
@@ -203,14 +406,25 @@ async def get_user_language(user_id: int) -> str:
     user_data = await get_user_data(user_id)
     return user_data.get("language", "en")
 
+async def read_user_language(user_id: int) -> str:
+    """User's language read from disk without creating or touching the record"""
+    try:
+        with storage_seconds.time("read", "user"):
+            async with aiofiles.open(f"users/{user_id}.json", "r", encoding="utf-8") as f:
+                language = json.loads(await f.read()).get("language", "en")
+    except (FileNotFoundError, ValueError):
+        return "en"
+    _user_languages[user_id] = language
+    return language
+
 async def set_user_language(user_id: int, language: str):
     """Set user's preferred language"""
     user_data = await get_user_data(user_id)
     user_data["language"] = language
     await save_user_data(user_id, user_data)
 
-async def get_all_users() -> List[Dict]:
-    """Get all users data for admin panel"""
+async def get_all_users(shard: Optional[int] = None, shards: int = 1) -> List[Dict]:
+    """Get all users data for admin panel (only users of `shard` out of `shards` if given)"""
     await ensure_directories()
     users = []
     
@@ -218,6 +432,8 @@ async def get_all_users() -> List[Dict]:
         for filename in os.listdir("users"):
             if filename.endswith(".json"):
                 user_id = int(filename.replace(".json", ""))
+                if shard is not None and shard_of(user_id, shards) != shard:
+                    continue
                 user_data = await get_user_data(user_id)
                 users.append(user_data)
     
@@ -283,8 +499,9 @@ async def log_transaction(transaction_type: str, data: Dict):
     
     # Write to daily log file
     today = datetime.now().strftime("%Y-%m-%d")
-    async with aiofiles.open(f"logs/transactions_{today}.json", "a", encoding="utf-8") as f:
-        await f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+    with storage_seconds.time("write", "transaction_log"):
+        async with aiofiles.open(f"logs/transactions_{today}.json", "a", encoding="utf-8") as f:
+            await f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
 
 async def migrate_from_single_user(old_config_path: str = "config.json", owner_id: int = None):
     """Migrate from single-user config to multi-user database"""
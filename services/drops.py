@@ -0,0 +1,221 @@
+# --- Стандартные библиотеки ---
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+# --- Сторонние библиотеки ---
+import aiofiles
+
+# --- Внутренние модули ---
+from services.config import DROPS_PATH, DROP_WINDOW
+
+logger = logging.getLogger(__name__)
+
+KEPT_DROPS = 50  # closed drops kept in memory and in the file
+EARLY_RESULTS_TTL = 60  # seconds a purchase result waits for the drop_seen event of its gift
+
+
+class DropDetector:
+    """
+    Catalog side of drop tracking, run by the process polling get_available_gifts.
+
+    The first catalog only seeds the known gift ids; afterwards every new id is a drop.
+    Limited drops are watched until their stock runs out (or they leave the catalog).
+    """
+
+    def __init__(self, window: float = 600):
+        """
+        :param window: Сколько секунд следить за остатком нового подарка.
+        """
+        self.window = window
+        self._known: Optional[Set[str]] = None
+        self._watched: Dict[str, float] = {}  # gift_id -> seen at
+
+    def scan(self, api_gifts, now: Optional[float] = None) -> Tuple[List[dict], List[str]]:
+        """
+        :return: (новые подарки: id, price, supply, seen_at; id распроданных подарков)
+        """
+        now = time.time() if now is None else now
+        current = {str(gift.id): gift for gift in api_gifts.gifts}
+        if self._known is None:
+            self._known = set(current)
+            return [], []
+        new = []
+        for gift_id, gift in current.items():
+            if gift_id in self._known:
+                continue
+            self._known.add(gift_id)
+            supply = getattr(gift, "total_count", None) or 0
+            new.append({"gift_id": gift_id, "price": gift.star_count, "supply": supply, "seen_at": now})
+            if supply:
+                self._watched[gift_id] = now
+        sold_out = []
+        for gift_id, seen_at in list(self._watched.items()):
+            gift = current.get(gift_id)
+            if gift is None or not getattr(gift, "remaining_count", None):
+                sold_out.append(gift_id)
+                del self._watched[gift_id]
+            elif now - seen_at > self.window:
+                del self._watched[gift_id]
+        return new, sold_out
+
+
+class _Drop:
+    __slots__ = ("gift_id", "price", "supply", "seen_at", "first_purchase_at", "sold_out_at", "wanted", "bought")
+
+    def __init__(self, gift_id: str, price: int, supply: int, seen_at: float):
+        self.gift_id = gift_id
+        self.price = price
+        self.supply = supply
+        self.seen_at = seen_at
+        self.first_purchase_at: Optional[float] = None
+        self.sold_out_at: Optional[float] = None
+        self.wanted: Dict[str, int] = {}  # "user:profile" -> units planned
+        self.bought: Dict[str, int] = {}  # "user:profile" -> units bought
+
+    def to_dict(self) -> dict:
+        wanted = sum(self.wanted.values())
+        bought = sum(self.bought.values())
+        missed = 0
+        if self.sold_out_at is not None:
+            missed = sum(max(0, units - self.bought.get(key, 0)) for key, units in self.wanted.items())
+        return {
+            "gift_id": self.gift_id,
+            "price": self.price,
+            "supply": self.supply,
+            "seen_at": self.seen_at,
+            "latency": None if self.first_purchase_at is None else self.first_purchase_at - self.seen_at,
+            "wanted": wanted,
+            "bought": bought,
+            "fill_rate": bought / wanted if wanted else None,
+            "missed_sold_out": missed,
+            "sold_out_at": self.sold_out_at,
+        }
+
+
+class DropTracker:
+    """
+    Drop-to-purchase SLO: for each new gift, the time from its first appearance in the
+    catalog to our first successful send_gift, the fill rate (units bought / units the
+    profiles planned to buy) and the units missed because the gift sold out.
+
+    Fed by worker events (see main.py), so shards and a separate worker role report into
+    the bot UI process. Events of different processes may arrive out of order, so results
+    for a gift not seen yet are held for EARLY_RESULTS_TTL seconds. A drop is closed
+    `window` seconds after it appeared and appended to `path` as one JSON line.
+    """
+
+    def __init__(self, path: str = "drops.jsonl", window: float = 600):
+        """
+        :param path: Файл закрытых дропов (JSON lines).
+        :param window: Сколько секунд после появления дроп остаётся открытым.
+        """
+        self.path = path
+        self.window = window
+        self._open: Dict[str, _Drop] = {}
+        self._closed: Deque[dict] = deque(maxlen=KEPT_DROPS)
+        self._early: Dict[str, List[tuple]] = {}  # gift_id -> [(received at, key, wanted, bought, first_at)]
+
+    def load(self) -> int:
+        """
+        Restores the latest closed drops from the file and compacts it to them.
+        Returns the number read.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        count = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self._closed.append(json.loads(line))
+                except ValueError:
+                    continue
+                count += 1
+        if count > len(self._closed):
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, separators=(",", ":")) + "\n" for record in self._closed)
+            os.replace(tmp_path, self.path)
+        return len(self._closed)
+
+    def seen(self, gift_id: str, price: int, supply: int, seen_at: float) -> None:
+        if gift_id not in self._open:
+            drop = self._open[gift_id] = _Drop(gift_id, price, supply, seen_at)
+            logger.info(f"Drop: new gift {gift_id} (★{price}, supply {supply or '∞'})")
+            for _, key, wanted, bought, first_at in self._early.pop(gift_id, ()):
+                self._add(drop, key, wanted, bought, first_at)
+
+    def purchases(self, user_id: int, profile: int, planned: list) -> None:
+        """
+        Result of one profile's purchase plan.
+        :param planned: Список [gift_id, запланировано, куплено, время первой покупки или None].
+        """
+        key = f"{user_id}:{profile}"
+        now = time.time()
+        for gift_id, wanted, bought, first_at in planned:
+            drop = self._open.get(str(gift_id))
+            if drop is None:
+                # Maybe drop_seen is still on its way from the poller process
+                self._early.setdefault(str(gift_id), []).append((now, key, wanted, bought, first_at))
+                continue
+            self._add(drop, key, wanted, bought, first_at)
+
+    @staticmethod
+    def _add(drop: _Drop, key: str, wanted: int, bought: int, first_at: Optional[float]) -> None:
+        drop.wanted[key] = max(drop.wanted.get(key, 0), wanted + drop.bought.get(key, 0))
+        if bought:
+            drop.bought[key] = drop.bought.get(key, 0) + bought
+            if drop.first_purchase_at is None or first_at < drop.first_purchase_at:
+                drop.first_purchase_at = first_at
+
+    def sold_out(self, gift_id: str, at: float) -> None:
+        drop = self._open.get(gift_id)
+        if drop is not None and drop.sold_out_at is None:
+            drop.sold_out_at = at
+
+    async def _append(self, drops: List[_Drop], still_open: bool = False) -> None:
+        """Moves drops to the closed ones and appends them to the file."""
+        lines = []
+        for drop in drops:
+            del self._open[drop.gift_id]
+            record = drop.to_dict()
+            if still_open:
+                record["open"] = True
+            self._closed.append(record)
+            lines.append(json.dumps(record, separators=(",", ":")) + "\n")
+        async with aiofiles.open(self.path, "a", encoding="utf-8") as f:
+            await f.write("".join(lines))
+
+    async def close_all(self) -> int:
+        """Stores the drops still inside the window, marked as open (shutdown, deploy)."""
+        drops = list(self._open.values())
+        if drops:
+            await self._append(drops, still_open=True)
+        return len(drops)
+
+    async def close_expired(self, now: Optional[float] = None) -> int:
+        """Closes drops older than the window and appends them to the file."""
+        now = time.time() if now is None else now
+        # Results of gifts that never turned out to be drops (regular catalog gifts)
+        for gift_id, results in list(self._early.items()):
+            results[:] = [result for result in results if now - result[0] <= EARLY_RESULTS_TTL]
+            if not results:
+                del self._early[gift_id]
+        expired = [drop for drop in self._open.values() if now - drop.seen_at > self.window]
+        if not expired:
+            return 0
+        await self._append(expired)
+        return len(expired)
+
+    def report(self, limit: int = 10) -> List[dict]:
+        """Latest drops (still open ones included), newest first."""
+        drops = [drop.to_dict() for drop in self._open.values()] + list(self._closed)
+        drops.sort(key=lambda drop: drop["seen_at"], reverse=True)
+        return drops[:limit]
+
+
+drop_detector = DropDetector(DROP_WINDOW)
+drop_tracker = DropTracker(DROPS_PATH, DROP_WINDOW)
@@ -0,0 +1,124 @@
+# --- Стандартные библиотеки ---
+import json
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+# --- Сторонние библиотеки ---
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM storage on a local SQLite file.
+
+    Nothing is kept in process memory: states survive restarts, idle records expire
+    after `ttl` seconds and the table is capped at `max_entries` rows (the least recently
+    used records are evicted first). Queries are tiny local lookups, so they run inline.
+    """
+
+    PRUNE_EVERY = 500  # writes between expiry/size-cap sweeps
+
+    def __init__(
+        self,
+        path: str = "fsm.sqlite3",
+        ttl: Optional[float] = 86400,
+        max_entries: Optional[int] = 10000,
+        key_builder: Optional[KeyBuilder] = None,
+    ) -> None:
+        """
+        :param path: SQLite database file.
+        :param ttl: Seconds after the last write when a record expires (None — never).
+        :param max_entries: Maximum number of stored records (None — unlimited).
+        :param key_builder: Builder of string keys from StorageKey.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+        self._writes = 0
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            " key TEXT PRIMARY KEY,"
+            " state TEXT,"
+            " data TEXT NOT NULL DEFAULT '{}',"
+            " updated_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS fsm_updated_at ON fsm (updated_at)")
+        self.prune()
+
+    async def close(self) -> None:
+        self._db.close()
+
+    def _read(self, key: StorageKey):
+        """Returns (state, data_json) of a live record or None."""
+        row = self._db.execute(
+            "SELECT state, data, updated_at FROM fsm WHERE key = ?",
+            (self.key_builder.build(key),)
+        ).fetchone()
+        if row is None:
+            return None
+        if self.ttl is not None and row[2] < time.time() - self.ttl:
+            self._db.execute("DELETE FROM fsm WHERE key = ?", (self.key_builder.build(key),))
+            return None
+        return row[0], row[1]
+
+    def _write(self, key: StorageKey, state: Optional[str], data: Dict[str, Any]) -> None:
+        """Upserts a record; an empty record (no state, no data) is deleted."""
+        storage_key = self.key_builder.build(key)
+        if state is None and not data:
+            self._db.execute("DELETE FROM fsm WHERE key = ?", (storage_key,))
+        else:
+            self._db.execute(
+                "INSERT INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data, "
+                "updated_at = excluded.updated_at",
+                (storage_key, state, json.dumps(data, ensure_ascii=False), time.time())
+            )
+        self._writes += 1
+        if self._writes >= self.PRUNE_EVERY:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Deletes expired records and evicts the oldest ones above max_entries.
+        Returns the number of removed records.
+        """
+        self._writes = 0
+        removed = 0
+        if self.ttl is not None:
+            removed += self._db.execute(
+                "DELETE FROM fsm WHERE updated_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+        if self.max_entries is not None:
+            removed += self._db.execute(
+                "DELETE FROM fsm WHERE key IN ("
+                " SELECT key FROM fsm ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+        if removed:
+            logger.info(f"FSM storage pruned {removed} records")
+        return removed
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = self._read(key)
+        data = json.loads(record[1]) if record else {}
+        self._write(key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self._read(key)
+        return record[0] if record else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = self._read(key)
+        self._write(key, record[0] if record else None, data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self._read(key)
+        return json.loads(record[1]) if record else {}
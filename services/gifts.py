@@ -1,6 +1,156 @@
+# --- Стандартные библиотеки ---
+import asyncio
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress
+from typing import Dict, List, Optional
+
 # --- Внутренние модули ---
 from utils.mockdata import generate_test_gifts
-from services.config import DEV_MODE
+from services.config import DEV_MODE, CATALOG_UI_MAX_AGE
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the gift catalog shared by all users.
+    FSM state keeps only `version` and a gift id instead of the gift list.
+    """
+    __slots__ = ("version", "gifts", "by_id", "_views")
+
+    def __init__(self, version: int, gifts: List[dict]):
+        self.version = version
+        self.gifts = gifts
+        self.by_id: Dict[str, dict] = {str(gift["id"]): gift for gift in gifts}
+        self._views: Dict[tuple, List[dict]] = {}
+
+    def get(self, gift_id) -> Optional[dict]:
+        """Returns gift by id in O(1), or None."""
+        return self.by_id.get(str(gift_id))
+
+    def view(self, sort: str = "pd", band: str = "a", limited: bool = False) -> List[dict]:
+        """
+        Sorted and filtered gift list, computed once per snapshot.
+
+        :param sort: Ключ из CATALOG_SORTS.
+        :param band: Ключ из PRICE_BANDS.
+        :param limited: Только лимитированные подарки.
+        """
+        key = (sort, band, limited)
+        gifts = self._views.get(key)
+        if gifts is None:
+            low, high = PRICE_BANDS.get(band, PRICE_BANDS["a"])
+            gifts = [
+                gift for gift in self.gifts
+                if low <= gift["price"] <= high and not (limited and gift["supply"] is None)
+            ]
+            sort_key, reverse = CATALOG_SORTS.get(sort, CATALOG_SORTS["pd"])
+            gifts.sort(key=sort_key, reverse=reverse)
+            self._views[key] = gifts
+        return gifts
+
+
+# Price bands of the catalog filter: key -> (min, max) inclusive
+PRICE_BANDS = {
+    "a": (0, float("inf")),
+    "p1": (0, 100),
+    "p2": (101, 1000),
+    "p3": (1001, float("inf")),
+}
+
+# Catalog sort orders: key -> (sort key, reverse)
+CATALOG_SORTS = {
+    "pd": (lambda gift: gift["price"], True),
+    "pa": (lambda gift: gift["price"], False),
+    # Limited gifts closest to sellout first, unlimited ones last
+    "lf": (lambda gift: (gift["supply"] is None, gift["left"] or 0), False),
+}
+
+_catalog_snapshot: Optional[CatalogSnapshot] = None
+
+
+def publish_catalog(gifts: List[dict]) -> CatalogSnapshot:
+    """
+    Makes the given normalized gift list the current catalog snapshot.
+    The version is bumped only if the catalog content actually changed.
+    """
+    global _catalog_snapshot
+    current = _catalog_snapshot
+    if current is not None and current.gifts == gifts:
+        return current
+    _catalog_snapshot = CatalogSnapshot((current.version + 1) if current else 1, gifts)
+    return _catalog_snapshot
+
+
+def get_catalog_snapshot() -> Optional[CatalogSnapshot]:
+    """Returns the current catalog snapshot (None before the first fetch)."""
+    return _catalog_snapshot
+
+
+def resolve_catalog_gift(version: Optional[int], gift_id) -> Optional[dict]:
+    """
+    Looks up a gift selected from catalog `version`.
+    If the snapshot is stale, the gift is taken from the current one (fresher stock data);
+    None means there is no catalog or the gift is no longer available.
+    """
+    snapshot = _catalog_snapshot
+    if snapshot is None or version is None:
+        return None
+    return snapshot.get(gift_id)
+
+_available_gifts = None
+_available_gifts_at = 0.0
+_available_gifts_fetch: Optional[asyncio.Task] = None
+_catalog_fingerprint: Optional[tuple] = None
+_catalog_changed_at = 0.0
+
+
+def install_available_gifts(result) -> None:
+    """
+    Makes `result` the cached get_available_gifts() response.
+    Used by fetches and by worker shards receiving the catalog from the poller process.
+    """
+    global _available_gifts, _available_gifts_at, _catalog_fingerprint, _catalog_changed_at
+    _available_gifts = result
+    _available_gifts_at = time.monotonic()
+    fingerprint = tuple((gift.id, gift.remaining_count) for gift in result.gifts)
+    if fingerprint != _catalog_fingerprint:
+        _catalog_fingerprint = fingerprint
+        _catalog_changed_at = _available_gifts_at
+
+
+async def _fetch_available_gifts(bot):
+    """Single API call shared by all concurrent callers of fetch_available_gifts."""
+    global _available_gifts_fetch
+    try:
+        result = await bot.get_available_gifts()
+        install_available_gifts(result)
+        return result
+    finally:
+        _available_gifts_fetch = None
+
+
+def get_catalog_changed_at() -> float:
+    """time.monotonic() of the last fetch that saw new gifts or stock changes (0 — never)."""
+    return _catalog_changed_at
+
+
+async def fetch_available_gifts(bot, max_age: float = CATALOG_UI_MAX_AGE):
+    """
+    Returns bot.get_available_gifts() no older than `max_age` seconds.
+    Concurrent callers share one in-flight request instead of each calling the API.
+
+    :param bot: Экземпляр бота aiogram.
+    :param max_age: Допустимый возраст кэша в секундах (0 — только свежий запрос).
+    """
+    global _available_gifts_fetch
+    if _available_gifts is not None and time.monotonic() - _available_gifts_at <= max_age:
+        return _available_gifts
+    if _available_gifts_fetch is None:
+        _available_gifts_fetch = asyncio.ensure_future(_fetch_available_gifts(bot))
+    # shield: a cancelled caller must not cancel the fetch other callers wait for
+    return await asyncio.shield(_available_gifts_fetch)
+
 
 def normalize_gift(gift) -> dict:
     """
@@ -9,16 +159,61 @@ def normalize_gift(gift) -> dict:
     :param gift: Объект Gift.
     :return: Словарь с параметрами подарка.
     """
+    sticker = getattr(gift, "sticker", None)
     return {
         "id": getattr(gift, "id", None),
         "price": getattr(gift, "star_count", 0),
         "supply": getattr(gift, "total_count", 0),
         "left": getattr(gift, "remaining_count", 0),
-        "sticker_file_id": getattr(getattr(gift, "sticker", None), "file_id", None),
-        "emoji": getattr(getattr(gift, "sticker", None), "emoji", None),
+        "sticker_file_id": getattr(sticker, "file_id", None),
+        "emoji": getattr(sticker, "emoji", None),
     }
 
 
+class GiftSnapshot:
+    """
+    Compact price-sorted form of one get_available_gifts() response.
+    Gifts are normalized once; parallel arrays of prices and supplies answer
+    price ranges with bisect and supply ranges with a single mask pass.
+    """
+    __slots__ = ("source", "records", "prices", "supplies")
+
+    def __init__(self, api_gifts):
+        self.source = api_gifts
+        records = [normalize_gift(gift) for gift in api_gifts.gifts]
+        # Ascending price, equal prices in reverse API order: reversed slices keep API order
+        order = sorted(range(len(records)), key=lambda i: (records[i]["price"] or 0, -i))
+        self.records = [records[i] for i in order]
+        self.prices = array("q", [record["price"] or 0 for record in self.records])
+        self.supplies = array("q", [record["supply"] or 0 for record in self.records])
+
+    def query(self, min_price, max_price, min_supply=0, max_supply=0, unlimited=False) -> List[dict]:
+        """
+        Gifts with price in [min_price, max_price] (and supply in range unless `unlimited`),
+        sorted by price descending. Returned records are shared: do not mutate them.
+        """
+        lo = bisect_left(self.prices, min_price)
+        hi = bisect_right(self.prices, max_price)
+        if unlimited:
+            selected = self.records[lo:hi]
+        else:
+            mask = [min_supply <= supply <= max_supply for supply in self.supplies[lo:hi]]
+            selected = list(compress(self.records[lo:hi], mask))
+        selected.reverse()
+        return selected
+
+
+_gift_snapshot: Optional[GiftSnapshot] = None
+
+
+def get_gift_snapshot(api_gifts) -> GiftSnapshot:
+    """Returns the GiftSnapshot of an API response, building it once per response."""
+    global _gift_snapshot
+    if _gift_snapshot is None or _gift_snapshot.source is not api_gifts:
+        _gift_snapshot = GiftSnapshot(api_gifts)
+    return _gift_snapshot
+
+
 async def get_filtered_gifts(
     bot, 
     min_price, 
@@ -27,7 +222,8 @@ async def get_filtered_gifts(
     max_supply, 
     unlimited=False,
     add_test_gifts=False,
-    test_gifts_count=5
+    test_gifts_count=5,
+    max_age=CATALOG_UI_MAX_AGE
 ):
     """
     Получает и фильтрует список подарков из API, возвращает их в нормализованном виде.
@@ -40,22 +236,12 @@ async def get_filtered_gifts(
     :param unlimited: Если True — игнорировать supply при фильтрации.
     :param add_test_gifts: Добавлять тестовые подарки в конец списка.
     :param test_gifts_count: Количество тестовых подарков.
+    :param max_age: Допустимый возраст кэша каталога в секундах.
     :return: Список словарей с параметрами подарков, отсортированный по цене по убыванию.
     """
-    # Get, normalize and filter gifts из маркета
-    api_gifts = await bot.get_available_gifts()
-    filtered = []
-    for gift in api_gifts.gifts:
-        price_ok = min_price <= gift.star_count <= max_price
-        # Логика по unlimited
-        if unlimited:
-            supply_ok = True
-        else:
-            supply = gift.total_count or 0
-            supply_ok = min_supply <= supply <= max_supply
-        if price_ok and supply_ok:
-            filtered.append(gift)
-    normalized = [normalize_gift(gift) for gift in filtered]
+    # Get and filter gifts из маркета (normalized once per API response)
+    api_gifts = await fetch_available_gifts(bot, max_age)
+    normalized = get_gift_snapshot(api_gifts).query(min_price, max_price, min_supply, max_supply, unlimited)
 
     # Get and filter test gifts отдельно
     test_gifts = []
@@ -68,6 +254,8 @@ async def get_filtered_gifts(
             )
         ]
 
+    if not test_gifts:
+        return normalized
     all_gifts = normalized + test_gifts
     all_gifts .sort(key=lambda g: g["price"], reverse=True)
     return all_gifts 
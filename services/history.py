@@ -0,0 +1,172 @@
+# --- Стандартные библиотеки ---
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# --- Сторонние библиотеки ---
+import aiofiles
+
+# --- Внутренние модули ---
+from services.config import HISTORY_PATH, HISTORY_WINDOW
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogHistory:
+    """
+    Append-only history of limited gift stock.
+
+    Each poll appends one JSON line `[timestamp, [[gift_id, left, supply, price], ...]]`
+    with only the gifts whose stock or price changed since the previous line, so idle
+    polls cost nothing on disk. The last `window` seconds of samples are kept in memory
+    to estimate sell-through velocity and time to sellout; on load the file is compacted
+    to the same samples.
+    """
+
+    def __init__(self, path: str = "catalog_history.jsonl", window: float = 600):
+        """
+        :param path: History file (JSON lines).
+        :param window: Seconds of samples used for velocity estimates.
+        """
+        self.path = path
+        self.window = window
+        self._last: Dict[str, Tuple[int, int, int]] = {}
+        self._samples: Dict[str, Deque[Tuple[float, int]]] = {}
+        self._remote: Optional[List[dict]] = None  # report of the worker process, see merge()
+        self.changed_at = 0.0  # time of the last recorded stock change
+
+    def _apply(self, timestamp: float, rows) -> None:
+        """Adds changed rows to the in-memory state."""
+        for gift_id, left, supply, price in rows:
+            self._last[gift_id] = (left, supply, price)
+            samples = self._samples.get(gift_id)
+            if samples is None:
+                samples = self._samples[gift_id] = deque()
+            samples.append((timestamp, left))
+            self._trim(samples, timestamp)
+        if rows:
+            self.changed_at = timestamp
+
+    def _trim(self, samples: Deque[Tuple[float, int]], now: float) -> None:
+        """Drops samples older than the window, keeping the newest one as a baseline."""
+        horizon = now - self.window
+        while len(samples) > 1 and samples[1][0] <= horizon:
+            samples.popleft()
+
+    def load(self) -> int:
+        """
+        Restores in-memory state from the history file and compacts it to the samples
+        still inside the window. Returns the number of lines read.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        count = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    timestamp, rows = json.loads(line)
+                except (ValueError, TypeError):
+                    continue
+                self._apply(timestamp, [tuple(row) for row in rows])
+                count += 1
+        now = time.time()
+        for samples in self._samples.values():
+            self._trim(samples, now)
+        self._compact(count)
+        return count
+
+    def _compact(self, count: int) -> None:
+        """Rewrites the file with the in-memory samples if it holds more lines than them."""
+        lines: Dict[float, list] = {}
+        for gift_id, samples in self._samples.items():
+            _, supply, price = self._last[gift_id]
+            for timestamp, left in samples:
+                lines.setdefault(timestamp, []).append((gift_id, left, supply, price))
+        if len(lines) >= count:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for timestamp in sorted(lines):
+                f.write(json.dumps([timestamp, lines[timestamp]], separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.path)
+        logger.info(f"Catalog history: compacted {count} lines to {len(lines)}")
+
+    async def record(self, api_gifts, now: Optional[float] = None) -> int:
+        """
+        Appends the limited gifts of a get_available_gifts() response that changed
+        since the previous record. Returns the number of changed gifts.
+        """
+        now = time.time() if now is None else now
+        rows = []
+        for gift in api_gifts.gifts:
+            supply = getattr(gift, "total_count", None)
+            if not supply:
+                continue
+            gift_id = str(gift.id)
+            state = (getattr(gift, "remaining_count", None) or 0, supply, gift.star_count)
+            if self._last.get(gift_id) != state:
+                rows.append((gift_id, *state))
+        if not rows:
+            return 0
+        self._apply(now, rows)
+        async with aiofiles.open(self.path, "a", encoding="utf-8") as f:
+            await f.write(json.dumps([round(now, 3), rows], separators=(",", ":")) + "\n")
+        return len(rows)
+
+    def velocity(self, gift_id, now: Optional[float] = None) -> float:
+        """Units sold per second over the window (0 if unknown or not selling)."""
+        samples = self._samples.get(str(gift_id))
+        if not samples:
+            return 0.0
+        now = time.time() if now is None else now
+        self._trim(samples, now)
+        first_at, first_left = samples[0]
+        sold = first_left - samples[-1][1]
+        if sold <= 0 or now <= first_at:
+            return 0.0
+        return sold / (now - first_at)
+
+    def sellout_eta(self, gift_id, now: Optional[float] = None) -> Optional[float]:
+        """Estimated seconds until the gift sells out, None if it is not selling."""
+        state = self._last.get(str(gift_id))
+        if state is None:
+            return None
+        if state[0] <= 0:
+            return 0.0
+        rate = self.velocity(gift_id, now)
+        return state[0] / rate if rate > 0 else None
+
+    def merge(self, rows: List[dict]) -> None:
+        """Stores the report sent by the worker process; served by `report` in a process not recording history."""
+        self._remote = rows
+
+    def report(self, limit: int = 10, now: Optional[float] = None) -> List[dict]:
+        """
+        Selling limited gifts, soonest sellout first.
+
+        :return: Список словарей: id, left, supply, price, velocity (шт/с), eta (с).
+        """
+        if self._remote is not None:
+            return self._remote[:limit]
+        now = time.time() if now is None else now
+        rows = []
+        for gift_id, (left, supply, price) in self._last.items():
+            rate = self.velocity(gift_id, now)
+            if left <= 0 or rate <= 0:
+                continue
+            rows.append({
+                "id": gift_id,
+                "left": left,
+                "supply": supply,
+                "price": price,
+                "velocity": rate,
+                "eta": left / rate,
+            })
+        rows.sort(key=lambda row: row["eta"])
+        return rows[:limit]
+
+
+catalog_history = CatalogHistory(HISTORY_PATH, HISTORY_WINDOW)
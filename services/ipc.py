@@ -0,0 +1,86 @@
+# --- Стандартные библиотеки ---
+import asyncio
+import json
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventBus:
+    """
+    Events from the purchase worker to the bot UI (notifications, menu refreshes).
+
+    In a single process `publish` calls the registered handler directly. A worker
+    running in another process calls `connect()` and its events go as JSON lines over
+    a unix socket to the UI process, which listens with `serve()`.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Callable[..., Awaitable]] = {}
+        self._path: Optional[str] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def on(self, event: str, handler: Callable[..., Awaitable]) -> None:
+        """Registers the coroutine handling `event` (called with the event fields as kwargs)."""
+        self._handlers[event] = handler
+
+    def connect(self, path: str) -> None:
+        """Sends all further events to the UI process listening on `path`."""
+        self._path = path
+
+    @property
+    def connected(self) -> bool:
+        """True in a worker process whose events go to another process."""
+        return self._path is not None
+
+    async def publish(self, event: str, **data) -> None:
+        if self._path is None:
+            await self.dispatch(event, data)
+            return
+        line = (json.dumps({"event": event, **data}, ensure_ascii=False) + "\n").encode()
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                if self._writer is None or self._writer.is_closing():
+                    _, self._writer = await asyncio.open_unix_connection(self._path)
+                self._writer.write(line)
+                await self._writer.drain()
+            except OSError as e:
+                self._writer = None
+                logger.error(f"IPC: event {event} dropped, UI at {self._path} unavailable: {e}")
+
+    async def dispatch(self, event: str, data: dict) -> None:
+        handler = self._handlers.get(event)
+        if handler is None:
+            logger.warning(f"IPC: no handler for event {event}")
+            return
+        try:
+            await handler(**data)
+        except Exception as e:
+            logger.error(f"IPC: handler of {event} failed: {e}")
+
+    async def serve(self, path: str) -> asyncio.AbstractServer:
+        """Listens for events of worker processes on a unix socket."""
+        if os.path.exists(path):
+            os.unlink(path)  # stale socket of a previous run
+        return await asyncio.start_unix_server(self._handle, path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                    event = message.pop("event")
+                except (ValueError, KeyError, AttributeError):
+                    logger.warning(f"IPC: malformed message {line[:100]!r}")
+                    continue
+                await self.dispatch(event, message)
+        finally:
+            writer.close()
+
+
+events = EventBus()
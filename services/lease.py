@@ -0,0 +1,83 @@
+# --- Стандартные библиотеки ---
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLease:
+    """
+    Exclusive lease of the purchase worker role on a lock file.
+
+    The holder keeps an fcntl.flock on the file for its whole lifetime; the kernel drops
+    the lock as soon as the process exits or is killed, so a standby instance polling
+    every `retry_interval` seconds takes over within that time. Two instances on the
+    same `users/` directory therefore never run purchases at once.
+    """
+
+    def __init__(self, path: str = "worker.lock", retry_interval: float = 1.0):
+        """
+        :param path: Lock file next to the data directory.
+        :param retry_interval: Seconds between takeover attempts of a standby instance.
+        """
+        self.path = path
+        self.retry_interval = retry_interval
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """Takes the lease if it is free. Never blocks."""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+        else:
+            logger.warning("fcntl is not available, worker lease is not enforced")
+        # Holder info for operators: pid, host, acquired at
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()} {socket.gethostname()} {time.time():.0f}\n".encode())
+        self._fd = fd
+        return True
+
+    async def acquire(self) -> None:
+        """Waits until this instance becomes the leader."""
+        if self.try_acquire():
+            logger.info(f"Worker lease acquired: {self.path}")
+            return
+        logger.info(f"Worker lease held by {self.holder()}, standing by")
+        while not self.try_acquire():
+            await asyncio.sleep(self.retry_interval)
+        logger.info(f"Worker lease taken over: {self.path}")
+
+    def holder(self) -> str:
+        """Holder info written by the current leader ("pid host timestamp")."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return f.read().strip() or "unknown"
+        except OSError:
+            return "unknown"
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
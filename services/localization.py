@@ -1,6 +1,7 @@
 import logging
-from typing import Dict, Any
-from services.database import get_user_language
+from string import Formatter
+from typing import Dict, Any, Optional
+from services.database import read_user_language, get_cached_language
 
 logger = logging.getLogger(__name__)
 
@@ -93,6 +94,11 @@ TEXTS = {
                                   "👤 <b>From:</b> {user_name}\n"
                                   "💸 <b>Amount:</b> <code>{commission}</code> coins\n"
                                   "📊 <b>Total:</b> <code>{balance}</code> coins",
+        "owner_digest": "📬 <b>DIGEST FOR {minutes} MIN</b>\n\n"
+                        "💰 <b>Commissions:</b> {commission_count} · <code>{commission_total}</code> coins\n"
+                        "💝 <b>Donations:</b> {donation_count} · <code>{donation_total}</code> stars\n\n"
+                        "👥 <b>Top by commission:</b>\n{top_commission}\n\n"
+                        "👥 <b>Top donors:</b>\n{top_donation}",
         
         # Language settings
         "language_selection": "🌐 <b>Language Selection</b>\n\nChoose your preferred language:",
@@ -205,47 +211,214 @@ TEXTS = {
         "yes_btn": "✅ Yes",
         "no_btn": "❌ No",
         "gift_bot_title": "Gift Bot",
-        "deposit_description": "Balance top-up"
+        "deposit_description": "Balance top-up",
+        "purchase_complete": "✅ <b>PROFILE COMPLETED!</b>\n\n🎁 All gifts for this profile have been purchased.",
+        "settings_menu": "⚙️ <b>Settings</b>",
+        "btn_language": "🌐 Language",
+        "language_select": "🌐 <b>Language Selection</b>\n\nChoose your preferred language:",
+        "language_ru": "🇷🇺 Русский",
+        "menu_outdated": "⚠️ Previous menu is outdated and cannot be deleted (more than 48 hours passed). Use the current menu.",
+        "target_channel": "{target} (Channel)",
+        "target_you": "<code>{target}</code> (You)"
+    },
+    "ru": {
+        # Main Menu
+        "main_menu_title": "🛸 <b>Центр управления Area 51</b>\n<code>v{version}</code>\n\n"
+                          "📊 <b>СОСТОЯНИЕ СИСТЕМЫ</b>\n"
+                          "├─ Статус: {status}\n"
+                          "├─ Активных пользователей: <code>{active_users:,}</code>\n"
+                          "├─ Комиссия: <code>{commission_rate}%</code>\n\n"
+                          "💰 <b>ФИНАНСЫ</b>\n"
+                          "├─ Ваш баланс: <code>{balance:,}</code> монет\n"
+                          "├─ Заработано комиссии: <code>{commission_balance:,}</code> монет\n\n",
+        "main_menu_user": "🛸 <b>Area 51 Bot</b>\n<code>v{version}</code>\n\n"
+                         "💰 <b>ВАШ АККАУНТ</b>\n"
+                         "├─ Баланс: <code>{balance:,}</code> монет\n"
+                         "├─ Профили: <code>{profiles_count}</code> активно\n"
+                         "├─ Статус: {status}\n\n",
+
+        # Buttons
+        "deposit_btn": "💎 Пополнить",
+        "withdraw_btn": "💸 Вывести",
+        "gift_catalog_btn": "🛍️ Магазин подарков",
+        "settings_btn": "⚙️ Настройки",
+        "help_btn": "❓ Помощь",
+        "admin_panel_btn": "👑 Панель владельца",
+        "profiles_btn": "📋 Профили",
+        "toggle_btn_on": "🚀 Включить",
+        "toggle_btn_off": "⏸️ Пауза",
+        "reset_btn": "🔄 Сбросить статистику",
+        "language_btn": "🌐 Язык",
+
+        # Status
+        "status_active": "🟢 <code>АКТИВЕН</code>",
+        "status_inactive": "🔴 <code>НЕАКТИВЕН</code>",
+
+        "donate_to_dev_button": "💝 Поддержать разработчика (★100)",
+        "contact_dev_button": "💬 Связаться с разработчиком",
+        "no_profiles": "❌ Нет профилей. Сначала добавьте профиль.",
+        "donation_success": "✅ <b>СПАСИБО ЗА ПОДДЕРЖКУ!</b>\n\n💝 Ваше пожертвование помогает развивать бота.",
+        "donation_failed": "❌ <b>ОШИБКА ПОЖЕРТВОВАНИЯ</b>\n\nПопробуйте ещё раз или напишите в поддержку.",
+        "counters_reset": "Счётчик покупок сброшен.",
+        "status_updated": "Статус обновлён",
+
+        # Commission system
+        "deposit_success": "✅ <b>ПОПОЛНЕНИЕ УСПЕШНО!</b>\n\n"
+                          "💰 <b>Внесено:</b> <code>{total_amount}</code> монет\n"
+                          "💸 <b>Комиссия ({rate}%):</b> <code>{commission}</code> монет\n"
+                          "🎯 <b>Зачислено:</b> <code>{user_amount}</code> монет\n\n"
+                          "🙏 Спасибо, что пользуетесь нашим сервисом!",
+        "commission_notification": "💰 <b>НОВАЯ КОМИССИЯ!</b>\n\n"
+                                  "👤 <b>От:</b> {user_name}\n"
+                                  "💸 <b>Сумма:</b> <code>{commission}</code> монет\n"
+                                  "📊 <b>Всего:</b> <code>{balance}</code> монет",
+        "owner_digest": "📬 <b>СВОДКА ЗА {minutes} МИН</b>\n\n"
+                        "💰 <b>Комиссии:</b> {commission_count} · <code>{commission_total}</code> монет\n"
+                        "💝 <b>Донаты:</b> {donation_count} · <code>{donation_total}</code> звёзд\n\n"
+                        "👥 <b>Топ по комиссиям:</b>\n{top_commission}\n\n"
+                        "👥 <b>Топ донатеров:</b>\n{top_donation}",
+
+        # Language settings
+        "language_selection": "🌐 <b>Выбор языка</b>\n\nВыберите язык интерфейса:",
+        "language_select": "🌐 <b>Выбор языка</b>\n\nВыберите язык интерфейса:",
+        "language_changed": "✅ Язык изменён на русский!",
+        "settings_menu": "⚙️ <b>Настройки</b>",
+        "btn_language": "🌐 Язык",
+
+        # Gift Catalog
+        "gift_selected": "🎯 <b>ВЫБОР ПОДАРКА</b>\n\n"
+                        "🎁 <b>Выбран:</b> {gift_display}\n"
+                        "💰 <b>Цена:</b> <code>{price:,}</code> монет за штуку\n\n"
+                        "📝 <b>Введите количество</b> для покупки:\n\n"
+                        "<code>/cancel</code> — отмена",
+        "enter_quantity_error": "❌ <b>ОШИБКА:</b> введите целое положительное число!",
+        "catalog_closed": "🚫 <b>Каталог закрыт.</b>",
+        "catalog_outdated": "⚠️ <b>Каталог устарел.</b> Откройте магазин заново.",
+        "purchase_processing": "⏳ <b>ОБРАБОТКА ПОКУПКИ...</b>\n\n🎁 Подождите, мы оформляем ваш заказ...",
+        "purchase_success": "✅ <b>ПОКУПКА ЗАВЕРШЕНА!</b>\n\n"
+                           "🎁 <b>Подарок:</b> {gift_display}\n"
+                           "📦 <b>Количество:</b> <code>{bought}/{qty}</code> куплено\n"
+                           "👤 <b>Получатель:</b> {recipient}",
+        "purchase_partial": "⚠️ <b>ПОКУПКА НЕ ЗАВЕРШЕНА</b>\n\n"
+                           "🎁 <b>Подарок:</b> {gift_display}\n"
+                           "📦 <b>Куплено:</b> <code>{bought}/{qty}</code> подарков\n"
+                           "👤 <b>Получатель:</b> {recipient}\n\n"
+                           "💰 <b>Решение:</b> пополните баланс!\n"
+                           "📦 <b>Примечание:</b> проверьте наличие подарка!\n"
+                           "🔴 <b>Статус:</b> бот поставлен на паузу.",
+        "purchase_complete": "✅ <b>ПРОФИЛЬ ВЫПОЛНЕН!</b>\n\n🎁 Все подарки по этому профилю куплены.",
+        "action_cancelled": "🚫 Действие отменено.",
+        "back_to_menu": "⬅️ В меню",
+        "confirm_btn": "✅ Подтвердить покупку",
+        "cancel_btn": "❌ Отмена",
+        "catalog_header": "🎁 <b>МАГАЗИН ПОДАРКОВ</b>\n\n"
+                         "🧸 <b>Обычные:</b> <code>{unlimited}</code> доступно\n"
+                         "💎 <b>Лимитированные:</b> <code>{limited}</code> эксклюзивных",
+        "purchase_summary": "📋 <b>ПОДТВЕРЖДЕНИЕ ПОКУПКИ</b>\n\n"
+                           "🎁 <b>Подарок:</b> {gift_display}\n"
+                           "📊 <b>Количество:</b> <code>{qty}</code> шт.\n"
+                           "💵 <b>Цена за штуку:</b> <code>{price:,}</code> монет\n"
+                           "💰 <b>Итого:</b> <code>{total:,}</code> монет\n"
+                           "👤 <b>Получатель:</b> {recipient}\n\n"
+                           "🔥 <b>Продолжить?</b>",
+        "invalid_purchase": "❌ <b>СЕССИЯ ИСТЕКЛА:</b> начните покупку заново.",
+
+        "btn_back": "⬅️ Назад",
+        "btn_main_menu": "🏠 Главное меню",
+
+        # Wizard texts
+        "wizard_deposit_amount": "💰 <b>Введите сумму пополнения</b>, например: `5000`\n\n`/cancel` — отмена",
+        "wizard_refund_id": "🆔 <b>Введите ID транзакции для возврата:</b>\n\n`/withdraw_all` — вывести весь баланс\n`/cancel` — отмена",
+        "wizard_guest_refund_id": "🆔 <b>Введите ID транзакции для возврата:</b>",
+        "wizard_number_error": "🚫 Введите положительное число. Попробуйте ещё раз.",
+        "wizard_deposit_range_error": "🚫 Введите число от 1 до 10000. Попробуйте ещё раз.",
+        "refund_success": "✅ Возврат выполнен успешно.",
+        "refund_error": "🚫 Ошибка возврата:\n`{error}`",
+        "no_stars_found": "⚠️ Звёзды для возврата не найдены.",
+        "withdraw_all_confirm": "⚠️ Вы уверены, что хотите вывести все звёзды?",
+        "withdraw_processing": "⏳ Выводим звёзды...",
+        "profile_updated": "✅ <b>Профиль {index}</b> обновлён.",
+        "profile_deleted": "✅ <b>Профиль {index}</b> удалён.",
+        "profile_delete_cancelled": "🚫 Удаление <b>профиля {index}</b> отменено.",
+        "confirm_delete_profile": "⚠️ Вы уверены, что хотите удалить <b>профиль {index}</b>?\n\n{profile_info}",
+        "yes_btn": "✅ Да",
+        "no_btn": "❌ Нет",
+        "gift_bot_title": "Gift Bot",
+        "deposit_description": "Пополнение баланса",
+        "menu_outdated": "⚠️ Предыдущее меню устарело и не может быть удалено (прошло больше 48 часов). Используйте текущее меню.",
+        "target_channel": "{target} (Канал)",
+        "target_you": "<code>{target}</code> (Вы)"
     }
 }
 
-async def get_text(user_id: int, key: str, **kwargs) -> str:
-    """Get localized text for user - ENGLISH ONLY"""
-    try:
-        # English only mode for professional experience
-        text = TEXTS["en"].get(key, key)
-        
-        # Format text with provided arguments
-        if kwargs:
-            try:
-                return text.format(**kwargs)
-            except (KeyError, ValueError) as e:
-                logger.warning(f"Text formatting error for key '{key}': {e}")
-                return text
-        return text
-    except Exception as e:
-        logger.error(f"Localization error for user {user_id}, key '{key}': {e}")
-        return TEXTS["en"].get(key, key)
+DEFAULT_LANGUAGE = "en"
+SUPPORTED_LANGUAGES = tuple(TEXTS)
+
+
+class _Template:
+    """
+    Localized string parsed once at import.
+    Parameterless templates are returned as is, others keep a bound str.format_map.
+    """
+    __slots__ = ("text", "fields", "format")
+
+    def __init__(self, key: str, text: str):
+        self.text = text
+        try:
+            self.fields = frozenset(
+                name.split(".")[0].split("[")[0]
+                for _, name, _, _ in Formatter().parse(text)
+                if name is not None
+            )
+        except ValueError as e:
+            logger.warning(f"Malformed template for key '{key}': {e}")
+            self.fields = frozenset()
+        self.format = text.format_map
+
+
+def _compile(texts: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, _Template]]:
+    """Parse all templates; missing keys of a language fall back to the default language."""
+    default = {key: _Template(key, text) for key, text in texts[DEFAULT_LANGUAGE].items()}
+    registry = {DEFAULT_LANGUAGE: default}
+    for language, strings in texts.items():
+        if language != DEFAULT_LANGUAGE:
+            registry[language] = {**default, **{key: _Template(key, text) for key, text in strings.items()}}
+    return registry
+
+
+_TEMPLATES = _compile(TEXTS)
 
-def get_text_sync(language: str, key: str, **kwargs) -> str:
-    """Get localized text synchronously - ENGLISH ONLY"""
+
+def get_text_sync(language: str, key: str, default: Optional[str] = None, **kwargs) -> str:
+    """Get localized text synchronously from the precompiled registry"""
+    template = _TEMPLATES.get(language, _TEMPLATES[DEFAULT_LANGUAGE]).get(key)
+    if template is None:
+        return default if default is not None else key
+    if not kwargs or not template.fields:
+        return template.text
     try:
-        text = TEXTS["en"].get(key, key)
-        
-        if kwargs:
-            try:
-                return text.format(**kwargs)
-            except (KeyError, ValueError) as e:
-                logger.warning(f"Text formatting error for key '{key}': {e}")
-                return text
-        return text
-    except Exception as e:
-        logger.error(f"Localization error for key '{key}': {e}")
-        return TEXTS["en"].get(key, key)
+        return template.format(kwargs)
+    except (KeyError, ValueError, IndexError) as e:
+        logger.warning(f"Text formatting error for key '{key}': {e}")
+        return template.text
+
+
+def user_language(user_id: int) -> str:
+    """Language of a user known to this process, without any I/O"""
+    return get_cached_language(user_id) or DEFAULT_LANGUAGE
+
+
+async def get_text(user_id: int, key: str, **kwargs) -> str:
+    """Get localized text for user"""
+    language = get_cached_language(user_id)
+    if language is None:
+        language = await read_user_language(user_id)
+    return get_text_sync(language, key, **kwargs)
 
 def detect_language_from_user(user) -> str:
-    """Detect language from Telegram user object - ENGLISH ONLY"""
-    return 'en'
+    """Detect language from Telegram user object"""
+    language_code = (getattr(user, "language_code", None) or "").split("-")[0]
+    return language_code if language_code in SUPPORTED_LANGUAGES else DEFAULT_LANGUAGE
 
 def format_number(number: int, language: str = "en") -> str:
     """Format number according to language locale - ENGLISH ONLY"""
@@ -253,13 +426,14 @@ def format_number(number: int, language: str = "en") -> str:
     return f"{number:,}"
 
 def get_target_display(profile: Dict, user_id: int, language: str) -> str:
-    """Get formatted target display text - ENGLISH ONLY"""
+    """Get formatted target display text"""
     target_chat_id = profile.get("TARGET_CHAT_ID")
     target_user_id = profile.get("TARGET_USER_ID")
     
     if target_chat_id:
-        return f"{target_chat_id} (Channel)"
+        return get_text_sync(language, "target_channel", target=target_chat_id)
     elif str(target_user_id) == str(user_id):
-        return f"<code>{target_user_id}</code> (You)"
+        return get_text_sync(language, "target_you", target=target_user_id)
     else:
-        return f"<code>{target_user_id}</code>" 
+        return f"<code>{target_user_id}</code>"
+
@@ -1,25 +1,71 @@
+# Standard libraries
+import asyncio
+import logging
+import os
+from typing import Dict, Optional, Set, Tuple
+
 # External libraries
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 # Internal libraries
-from services.database import get_user_data, save_user_data
-from services.localization import get_text, get_target_display
+from services.database import get_user_data, save_user_data, get_user_version, get_data_epoch
+from services.localization import get_text, get_text_sync, get_target_display
+from services.config import MENU_EDIT_IN_PLACE, MENU_DEBOUNCE_WINDOW
+from services.outbox import outbox, PRIORITY_HIGH
+
+logger = logging.getLogger(__name__)
+
+# Rendered menus: (user_id, is_owner) -> (version, text, keyboard, digest)
+_menu_cache: Dict[Tuple[int, bool], Tuple[tuple, str, InlineKeyboardMarkup, int]] = {}
+
+# Menu currently shown to a user: user_id -> (message_id, digest of its content)
+_menu_messages: Dict[int, Tuple[int, Optional[int]]] = {}
+
+
+class _MenuRefresh:
+    """
+    Menu refresh in progress for a chat; later requests are folded into it.
+    """
+    __slots__ = ("message_id", "is_owner", "dirty")
+
+    def __init__(self, message_id: int, is_owner: bool):
+        self.message_id = message_id
+        self.is_owner = is_owner
+        self.dirty = False
+
+
+# Refreshes in progress: chat_id -> _MenuRefresh
+_menu_refreshes: Dict[int, _MenuRefresh] = {}
+# Trailing refreshes scheduled after the debounce window
+_trailing_tasks: Set[asyncio.Task] = set()
 
-async def update_last_menu_message_id(user_id: int, message_id: int):
+async def update_last_menu_message_id(user_id: int, message_id: int, digest: int = None):
     """
     Saves the last menu message ID for a user.
     """
+    _menu_messages[user_id] = (message_id, digest)
     user_data = await get_user_data(user_id)
     user_data["last_menu_message_id"] = message_id
     await save_user_data(user_id, user_data)
 
 
+async def detach_menu_message(user_id: int, message_id: int):
+    """
+    Marks the menu message as turned into a result text that must stay visible:
+    the next refresh sends a new menu below it instead of editing or deleting it.
+    """
+    if await get_last_menu_message_id(user_id) == message_id:
+        await update_last_menu_message_id(user_id, None)
+
+
 async def get_last_menu_message_id(user_id: int):
     """
     Returns the last menu message ID for a user.
     """
+    if user_id in _menu_messages:
+        return _menu_messages[user_id][0]
     user_data = await get_user_data(user_id)
     return user_data.get("last_menu_message_id")
 
@@ -30,8 +76,9 @@ async def config_action_keyboard(user_id: int, is_owner: bool = False) -> Inline
     """
     user_data = await get_user_data(user_id)
     is_active = user_data.get("active", False)
+    language = user_data.get("language", "en")
     
-    toggle_text = await get_text(user_id, "toggle_btn_off" if is_active else "toggle_btn_on")
+    toggle_text = get_text_sync(language, "toggle_btn_off" if is_active else "toggle_btn_on")
     
     keyboard = [
         # Main control buttons
@@ -40,40 +87,149 @@ async def config_action_keyboard(user_id: int, is_owner: bool = False) -> Inline
         ],
         # Management buttons
         [
-            InlineKeyboardButton(text=await get_text(user_id, "profiles_btn"), callback_data="profiles_menu"),
-            InlineKeyboardButton(text=await get_text(user_id, "reset_btn"), callback_data="reset_bought")
+            InlineKeyboardButton(text=get_text_sync(language, "profiles_btn"), callback_data="profiles_menu"),
+            InlineKeyboardButton(text=get_text_sync(language, "reset_btn"), callback_data="reset_bought")
         ],
         # Financial buttons
         [
-            InlineKeyboardButton(text=await get_text(user_id, "deposit_btn"), callback_data="deposit_menu"),
-            InlineKeyboardButton(text=await get_text(user_id, "withdraw_btn"), callback_data="refund_menu")
+            InlineKeyboardButton(text=get_text_sync(language, "deposit_btn"), callback_data="deposit_menu"),
+            InlineKeyboardButton(text=get_text_sync(language, "withdraw_btn"), callback_data="refund_menu")
         ],
         # Store and settings
         [
-            InlineKeyboardButton(text=await get_text(user_id, "gift_catalog_btn"), callback_data="catalog")
+            InlineKeyboardButton(text=get_text_sync(language, "gift_catalog_btn"), callback_data="catalog")
         ],
         [
-            InlineKeyboardButton(text=await get_text(user_id, "settings_btn"), callback_data="settings_menu"),
-            InlineKeyboardButton(text=await get_text(user_id, "help_btn"), callback_data="show_help")
+            InlineKeyboardButton(text=get_text_sync(language, "settings_btn"), callback_data="settings_menu"),
+            InlineKeyboardButton(text=get_text_sync(language, "help_btn"), callback_data="show_help")
         ]
     ]
     
     # Add admin panel for owner
     if is_owner:
         keyboard.insert(1, [
-            InlineKeyboardButton(text=await get_text(user_id, "admin_panel_btn"), callback_data="admin_panel")
+            InlineKeyboardButton(text=get_text_sync(language, "admin_panel_btn"), callback_data="admin_panel")
         ])
     
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+def menu_version(user_id: int) -> tuple:
+    """
+    Returns the data version the menu of a user depends on.
+    The owner menu shows system-wide analytics, so it also tracks the global epoch.
+    """
+    if str(user_id) == os.getenv("TELEGRAM_USER_ID"):
+        return (get_user_version(user_id), get_data_epoch())
+    return (get_user_version(user_id),)
+
+
+async def render_menu(user_id: int, is_owner: bool = False) -> Tuple[str, InlineKeyboardMarkup, int]:
+    """
+    Returns menu text, keyboard and content digest,
+    reusing the cached render while user data is unchanged.
+    """
+    version = menu_version(user_id)
+    cached = _menu_cache.get((user_id, is_owner))
+    if cached and cached[0] == version:
+        return cached[1], cached[2], cached[3]
+
+    text = await format_user_summary(user_id)
+    keyboard = await config_action_keyboard(user_id, is_owner)
+    digest = hash((text, keyboard.model_dump_json()))
+    # Store under the version read before rendering: a concurrent change forces a re-render
+    _menu_cache[(user_id, is_owner)] = (version, text, keyboard, digest)
+    return text, keyboard, digest
+
+
 async def update_menu(bot, chat_id: int, user_id: int, message_id: int, is_owner: bool = False):
     """
-    Updates menu in chat: deletes previous and sends new one.
+    Updates menu in chat, coalescing bursts of refreshes.
+    The first request refreshes right away. Requests arriving while it runs (or within
+    MENU_DEBOUNCE_WINDOW after it) return at once and are merged into a single trailing
+    refresh, run in the background once the window has passed.
+    """
+    refresh = _menu_refreshes.get(chat_id)
+    if refresh is not None:
+        refresh.message_id = max(refresh.message_id, message_id)
+        refresh.is_owner = refresh.is_owner or is_owner
+        refresh.dirty = True
+        return
+
+    refresh = _MenuRefresh(message_id, is_owner)
+    _menu_refreshes[chat_id] = refresh
+    try:
+        await refresh_menu(bot, chat_id, user_id, refresh.message_id, refresh.is_owner)
+    finally:
+        if MENU_DEBOUNCE_WINDOW > 0 or refresh.dirty:
+            task = asyncio.create_task(_trailing_refresh(bot, chat_id, user_id, refresh))
+            _trailing_tasks.add(task)
+            task.add_done_callback(_trailing_tasks.discard)
+        else:
+            del _menu_refreshes[chat_id]
+
+
+async def _trailing_refresh(bot, chat_id: int, user_id: int, refresh: _MenuRefresh):
+    """Runs the merged refresh after each debounce window while new requests keep arriving."""
+    try:
+        while True:
+            if MENU_DEBOUNCE_WINDOW > 0:
+                await asyncio.sleep(MENU_DEBOUNCE_WINDOW)
+            if not refresh.dirty:
+                break
+            refresh.dirty = False
+            try:
+                await refresh_menu(bot, chat_id, user_id, refresh.message_id, refresh.is_owner)
+            except Exception as e:
+                logger.error(f"Trailing menu refresh for chat {chat_id} failed: {e}")
+    finally:
+        del _menu_refreshes[chat_id]
+
+
+async def refresh_menu(bot, chat_id: int, user_id: int, message_id: int, is_owner: bool = False):
     """
+    Refreshes menu in chat immediately.
+    If the menu is still the latest message of the interaction, it is edited in place
+    (or left untouched when nothing changed); otherwise the previous menu is deleted
+    and a new one is sent. A refresh triggered from the menu message itself always edits:
+    handlers turn that message into sub-screens (settings, admin panel) behind our back.
+    """
+    text, keyboard, digest = await render_menu(user_id, is_owner)
+
+    if MENU_EDIT_IN_PLACE:
+        last_menu_message_id = await get_last_menu_message_id(user_id)
+        if last_menu_message_id and message_id <= last_menu_message_id:
+            force = message_id == last_menu_message_id
+            if await edit_menu(bot, chat_id, user_id, last_menu_message_id, text, keyboard, digest, force):
+                return
+
     await delete_menu(bot=bot, chat_id=chat_id, user_id=user_id, current_message_id=message_id)
-    text = await format_user_summary(user_id)
-    await send_menu(bot=bot, chat_id=chat_id, user_id=user_id, text=text, is_owner=is_owner)
+    await send_menu(bot=bot, chat_id=chat_id, user_id=user_id, text=text, is_owner=is_owner,
+                    keyboard=keyboard, digest=digest)
+
+
+async def edit_menu(bot, chat_id: int, user_id: int, menu_message_id: int,
+                    text: str, keyboard: InlineKeyboardMarkup, digest: int, force: bool = False) -> bool:
+    """
+    Edits the existing menu message. Skips the API call if its content is unchanged,
+    unless `force` (the message may show another screen now).
+    Returns False if the message can no longer be edited.
+    """
+    shown = _menu_messages.get(user_id)
+    if not force and shown and shown == (menu_message_id, digest):
+        return True
+    try:
+        await bot.edit_message_text(
+            chat_id=chat_id,
+            message_id=menu_message_id,
+            text=text,
+            reply_markup=keyboard
+        )
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            return False
+    _menu_messages[user_id] = (menu_message_id, digest)
+    return True
 
 
 async def delete_menu(bot, chat_id: int, user_id: int, current_message_id: int = None):
@@ -92,24 +248,22 @@ async def delete_menu(bot, chat_id: int, user_id: int, current_message_id: int =
                     "menu_outdated", 
                     default="⚠️ Previous menu is outdated and cannot be deleted (more than 48 hours passed). Use the current menu."
                 )
-                await bot.send_message(chat_id, outdated_text)
+                outbox.notify(bot, chat_id, outdated_text, priority=PRIORITY_HIGH)
             elif "message to delete not found" in error_text:
                 pass
             else:
                 raise
 
 
-async def send_menu(bot, chat_id: int, user_id: int, text: str, is_owner: bool = False) -> int:
+async def send_menu(bot, chat_id: int, user_id: int, text: str, is_owner: bool = False,
+                    keyboard: InlineKeyboardMarkup = None, digest: int = None) -> int:
     """
     Sends new menu to chat and updates last message ID.
     """
-    keyboard = await config_action_keyboard(user_id, is_owner)
-    sent = await bot.send_message(
-        chat_id=chat_id,
-        text=text,
-        reply_markup=keyboard
-    )
-    await update_last_menu_message_id(user_id, sent.message_id)
+    if keyboard is None:
+        keyboard = await config_action_keyboard(user_id, is_owner)
+    sent = await outbox.send(bot, chat_id, text, priority=PRIORITY_HIGH, reply_markup=keyboard)
+    await update_last_menu_message_id(user_id, sent.message_id, digest)
     return sent.message_id
 
 
@@ -124,10 +278,11 @@ async def format_user_summary(user_id: int) -> str:
     profiles = user_data.get("profiles", [])
     balance = user_data.get("balance", 0)
     is_owner = user_id == owner_data.get("owner_id", user_id)
+    user_language = user_data.get("language", "en")
     
     # Determine status
     is_active = user_data.get("active", False)
-    status = await get_text(user_id, "status_active" if is_active else "status_inactive")
+    status = get_text_sync(user_language, "status_active" if is_active else "status_inactive")
     
     # Choose appropriate menu template
     if is_owner:
@@ -136,7 +291,7 @@ async def format_user_summary(user_id: int) -> str:
         analytics = await get_analytics()
         spending_stats = await get_admin_spending_stats()
         
-        text = await get_text(user_id, "main_menu_title", 
+        text = get_text_sync(user_language, "main_menu_title", 
                             version="2.0.0",
                             balance=balance,  # FIXED: Use actual user balance, not stars_balance
                             active_users=analytics["active_users"], 
@@ -159,7 +314,7 @@ async def format_user_summary(user_id: int) -> str:
         text += spending_text
     else:
         # Regular user sees their data
-        text = await get_text(user_id, "main_menu_user", 
+        text = get_text_sync(user_language, "main_menu_user", 
                             version="2.0.0",
                             balance=balance,
                             profiles_count=len(profiles),
@@ -167,8 +322,6 @@ async def format_user_summary(user_id: int) -> str:
     
     # Add profile summaries only for users with profiles
     if profiles:
-        user_language = user_data.get("language", "en")
-        
         for idx, profile in enumerate(profiles, 1):
             target_display = get_target_display(profile, user_id, user_language)
             
@@ -0,0 +1,244 @@
+# --- Стандартные библиотеки ---
+import logging
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+# --- Сторонние библиотеки ---
+from aiohttp import web
+
+# --- Внутренние модули ---
+from services.config import METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STORAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+LOCAL_PROCESS = "main"  # `process` label of samples of the serving process
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Tuple[str, ...]):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: Dict[Tuple, object] = {}
+
+    def export(self) -> list:
+        return [[list(labels), value] for labels, value in self.values.items()]
+
+    def samples(self, values: Dict[Tuple, object], process: str) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        if self.registry.enabled:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self, values, process):
+        extra = f'process="{_escape(process)}"'
+        return [
+            f"{self.name}_total{_labels(self.labelnames, labels, extra)} {_number(value)}"
+            for labels, value in values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """Value read at scrape time from registered callbacks (queue sizes and the like)."""
+    type = "gauge"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._functions: Dict[Tuple, Callable[[], float]] = {}
+
+    def track(self, *labels, function: Callable[[], float]) -> None:
+        self._functions[labels] = function
+
+    def collect(self) -> None:
+        for labels, function in self._functions.items():
+            try:
+                self.values[labels] = function()
+            except Exception as e:
+                logger.warning(f"Gauge {self.name}{labels} failed: {e}")
+
+    def samples(self, values, process):
+        extra = f'process="{_escape(process)}"'
+        return [
+            f"{self.name}{_labels(self.labelnames, labels, extra)} {_number(value)}"
+            for labels, value in values.items()
+        ]
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: Tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; a value is [bucket counts..., count, sum]."""
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(*args)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels) -> None:
+        if not self.registry.enabled:
+            return
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1  # per-bucket, made cumulative on render
+        state[-1] += value
+
+    def time(self, *labels):
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels) if self.registry.enabled else _NULL_TIMER
+
+    def samples(self, values, process):
+        lines = []
+        process_label = f'process="{_escape(process)}"'
+        for labels, state in values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), state[:-1]):
+                cumulative += count
+                le = f'le="{bound}"' if bound == "+Inf" else f'le="{float(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, labels, process_label + ',' + le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels, process_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels, process_label)} {_number(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metrics exposed in OpenMetrics text format.
+
+    Metric objects exist even when disabled; their update methods then return at once.
+    Worker processes (worker role, shards) send `export()` over the event bus and the
+    serving process renders them next to its own samples with a `process` label.
+    """
+
+    def __init__(self, enabled: bool = False):
+        """
+        :param enabled: Собирать ли метрики.
+        """
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._remote: Dict[str, dict] = {}  # process -> metric name -> exported values
+
+    def _add(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._add(Gauge(self, name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(self, name, documentation, labelnames, buckets=buckets))
+
+    def export(self) -> dict:
+        for metric in self._metrics.values():
+            if isinstance(metric, Gauge):
+                metric.collect()
+        return {name: metric.export() for name, metric in self._metrics.items() if metric.values}
+
+    def merge(self, process: str, exported: dict) -> None:
+        """Replaces the samples last reported by another process (cumulative since its start)."""
+        self._remote[process] = exported
+
+    def render(self) -> str:
+        sources = [(LOCAL_PROCESS, self.export())] + list(self._remote.items())
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.append(f"# HELP {name} {metric.documentation}")
+            for process, exported in sources:
+                values = {tuple(labels): value for labels, value in exported.get(name, ())}
+                lines.extend(metric.samples(values, process))
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    async def serve(self, host: str, port: int, path: str = "/metrics") -> web.AppRunner:
+        """Starts the scrape endpoint; returns the runner to clean up on shutdown."""
+        app = web.Application()
+        app.router.add_get(path, self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Metrics: serving http://{host}:{port}{path}")
+        return runner
+
+
+metrics = MetricsRegistry(METRICS_PORT > 0)
+
+# Purchase path
+gift_purchases = metrics.counter("tgbot_purchases", "Gift purchases by gift and result (attempted, succeeded, failed).", ("gift", "result"))
+send_gift_seconds = metrics.histogram("tgbot_send_gift_seconds", "Latency of sendGift calls.")
+worker_tick_seconds = metrics.histogram("tgbot_worker_tick_seconds", "Duration of one purchase worker pass.")
+flood_waits = metrics.counter("tgbot_flood_waits", "Flood waits (RetryAfter) received, by caller.", ("source",))
+flood_wait_seconds = metrics.counter("tgbot_flood_wait_seconds", "Seconds of flood wait imposed, by caller.", ("source",))
+
+# Bot side
+queue_depth = metrics.gauge("tgbot_queue_depth", "Items waiting in internal queues.", ("queue",))
+storage_seconds = metrics.histogram(
+    "tgbot_storage_seconds", "Latency of JSON storage operations.", ("operation", "record"), buckets=STORAGE_BUCKETS
+)
+handler_seconds = metrics.histogram("tgbot_handler_seconds", "Update handling latency per handler.", ("handler",))
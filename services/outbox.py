@@ -0,0 +1,166 @@
+# --- Стандартные библиотеки ---
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Set
+
+# --- Сторонние библиотеки ---
+from aiogram.exceptions import TelegramRetryAfter
+
+# --- Внутренние модули ---
+from services.config import OUTBOX_CHAT_INTERVAL, OUTBOX_GLOBAL_RATE
+from services.metrics import flood_waits, flood_wait_seconds, queue_depth
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, served in this order
+PRIORITY_HIGH = 0  # interactive: menus
+PRIORITY_NORMAL = 1  # user notifications: purchases
+PRIORITY_LOW = 2  # owner notifications: commissions, donations
+
+MESSAGE_LIMIT = 4096  # Telegram text length limit
+
+
+class _Outgoing:
+    __slots__ = ("bot", "chat_id", "text", "kwargs", "future")
+
+    def __init__(self, bot, chat_id: int, text: str, kwargs: dict):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class Outbox:
+    """
+    Single outbound queue for bot messages.
+
+    Messages wait in priority lanes, one FIFO per chat; the sender takes the highest
+    lane with a chat allowed to receive now, rotating between chats so one busy chat
+    does not hold back others. Each chat gets at most one message per `chat_interval`
+    seconds and the bot at most `global_rate` messages per second. Plain-text messages
+    queued for the same chat in the same lane go out as one message.
+    Callers never wait for the rate limits unless they await the returned future.
+    """
+
+    def __init__(self, chat_interval: float = 1.0, global_rate: float = 30.0):
+        """
+        :param chat_interval: Минимальный интервал между сообщениями в один чат, секунды.
+        :param global_rate: Максимум сообщений в секунду для всего бота.
+        """
+        self.chat_interval = chat_interval
+        self.global_rate = global_rate
+        self._lanes: List["OrderedDict[int, Deque[_Outgoing]]"] = [OrderedDict() for _ in range(3)]
+        self._chat_next: Dict[int, float] = {}
+        self._global_next = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._deliveries: Set[asyncio.Task] = set()  # sends in flight, referenced until done
+        # Metrics
+        self.sent = 0
+        self.batched = 0
+        self.failed = 0
+        self.retries = 0
+
+    def pending(self) -> int:
+        return sum(len(queue) for lane in self._lanes for queue in lane.values())
+
+    def send(self, bot, chat_id: int, text: str, priority: int = PRIORITY_NORMAL, **kwargs) -> asyncio.Future:
+        """
+        Queues bot.send_message(chat_id, text, **kwargs).
+        Returns a future with the sent Message (or the send error).
+        """
+        message = _Outgoing(bot, chat_id, text, kwargs)
+        self._lanes[priority].setdefault(chat_id, deque()).append(message)
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+        return message.future
+
+    def notify(self, bot, chat_id: int, text: str, priority: int = PRIORITY_NORMAL, **kwargs) -> None:
+        """Fire-and-forget send: errors are logged, never raised to the caller."""
+        future = self.send(bot, chat_id, text, priority, **kwargs)
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    def _pick(self, now: float):
+        """Highest-priority (lane, chat_id) allowed to send now, or None."""
+        for lane in self._lanes:
+            for chat_id in lane:
+                if self._chat_next.get(chat_id, 0.0) <= now:
+                    return lane, chat_id
+        return None
+
+    def _take(self, lane, chat_id: int) -> List[_Outgoing]:
+        """Pops the next message of a chat, merged with following plain-text ones."""
+        queue = lane[chat_id]
+        batch = [queue.popleft()]
+        if not batch[0].kwargs:
+            size = len(batch[0].text)
+            while queue and not queue[0].kwargs and size + 2 + len(queue[0].text) <= MESSAGE_LIMIT:
+                size += 2 + len(queue[0].text)
+                batch.append(queue.popleft())
+        if queue:
+            lane.move_to_end(chat_id)  # round-robin between chats of a lane
+        else:
+            del lane[chat_id]
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._global_next:
+                await asyncio.sleep(self._global_next - now)
+                continue
+            picked = self._pick(now)
+            if picked is None:
+                waiting = [self._chat_next[chat_id] for lane in self._lanes for chat_id in lane]
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), (min(waiting) - now) if waiting else None)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            batch = self._take(*picked)
+            self._chat_next[picked[1]] = now + self.chat_interval
+            self._global_next = now + 1 / self.global_rate
+            task = asyncio.create_task(self._deliver(picked[0], batch))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, lane, batch: List[_Outgoing]) -> None:
+        first = batch[0]
+        text = "\n\n".join(message.text for message in batch)
+        try:
+            result = await first.bot.send_message(first.chat_id, text, **first.kwargs)
+        except TelegramRetryAfter as e:
+            # Back to the head of the chat queue once the flood wait is over
+            self.retries += 1
+            flood_waits.inc("send_message")
+            flood_wait_seconds.inc("send_message", amount=e.retry_after)
+            self._chat_next[first.chat_id] = time.monotonic() + e.retry_after
+            lane.setdefault(first.chat_id, deque()).extendleft(reversed(batch))
+            self._wakeup.set()
+            return
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to send message to {first.chat_id}: {e}")
+            for message in batch:
+                if not message.future.done():
+                    message.future.set_exception(e)
+            return
+        self.sent += 1
+        self.batched += len(batch) - 1
+        for message in batch:
+            if not message.future.done():
+                message.future.set_result(result)
+        # Forget chats idle for a while so the map does not grow forever
+        if len(self._chat_next) > 10000:
+            now = time.monotonic()
+            self._chat_next = {chat: at for chat, at in self._chat_next.items() if at > now}
+
+
+outbox = Outbox(OUTBOX_CHAT_INTERVAL, OUTBOX_GLOBAL_RATE)
+queue_depth.track("outbox", function=outbox.pending)
@@ -0,0 +1,111 @@
+# --- Стандартные библиотеки ---
+import asyncio
+import html
+import logging
+from typing import Dict, Optional
+
+# --- Внутренние модули ---
+from services.config import OWNER_DIGEST_WINDOW, OWNER_ALERT_THRESHOLD
+from services.localization import get_text
+from services.outbox import outbox, PRIORITY_LOW
+from services.metrics import queue_depth
+
+logger = logging.getLogger(__name__)
+
+COMMISSION = "commission"
+DONATION = "donation"
+
+TOP_USERS = 5  # users listed per kind in a digest
+
+
+class _Pending:
+    """Events of one owner collected since the last digest."""
+    __slots__ = ("bot", "counts", "totals", "users", "task")
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.counts = {COMMISSION: 0, DONATION: 0}
+        self.totals = {COMMISSION: 0, DONATION: 0}
+        # kind -> user_id -> [name, amount]; commissions are coins, donations stars
+        self.users: Dict[str, Dict[int, list]] = {COMMISSION: {}, DONATION: {}}
+        self.task: Optional[asyncio.Task] = None
+
+
+class OwnerDigest:
+    """
+    Owner notifications about commissions and donations.
+
+    With `window` > 0 events are collected and the owner receives one summary per window
+    (counts, totals, top users of each kind) instead of a message per deposit. Events of at least
+    `alert_threshold` are still sent right away. `window` = 0 sends every event at once.
+    """
+
+    def __init__(self, window: float = 0.0, alert_threshold: int = 0):
+        """
+        :param window: Окно накопления событий, секунды (0 — без дайджеста).
+        :param alert_threshold: Сумма, от которой событие отправляется сразу (0 — никогда).
+        """
+        self.window = window
+        self.alert_threshold = alert_threshold
+        self._pending: Dict[int, _Pending] = {}
+
+    def pending(self) -> int:
+        """Events waiting for the next digest."""
+        return sum(sum(pending.counts.values()) for pending in self._pending.values())
+
+    def add(self, bot, owner_id: int, kind: str, user_id: int, user_name: str, amount: int, text: str) -> None:
+        """
+        Registers an event for the owner.
+        :param kind: COMMISSION или DONATION.
+        :param amount: Комиссия в монетах или донат в звёздах.
+        :param text: Готовое уведомление для немедленной отправки.
+        """
+        if self.window <= 0 or (self.alert_threshold and amount >= self.alert_threshold):
+            outbox.notify(bot, owner_id, text, priority=PRIORITY_LOW)
+            return
+        pending = self._pending.get(owner_id)
+        if pending is None:
+            pending = self._pending[owner_id] = _Pending(bot)
+            pending.task = asyncio.create_task(self._flush_later(owner_id))
+        pending.counts[kind] += 1
+        pending.totals[kind] += amount
+        user = pending.users[kind].setdefault(user_id, [user_name, 0])
+        user[1] += amount
+
+    async def _flush_later(self, owner_id: int) -> None:
+        await asyncio.sleep(self.window)
+        await self.flush(owner_id)
+
+    @staticmethod
+    def _top(users: Dict[int, list]) -> str:
+        """Top users of one kind, largest amount first."""
+        top = sorted(users.items(), key=lambda item: item[1][1], reverse=True)[:TOP_USERS]
+        return "\n".join(
+            f"{place}. {html.escape(name)} ({user_id}): <code>{amount}</code>"
+            for place, (user_id, (name, amount)) in enumerate(top, 1)
+        ) or "—"
+
+    async def flush(self, owner_id: int) -> None:
+        """Sends the collected digest of the owner now."""
+        pending = self._pending.pop(owner_id, None)
+        if pending is None:
+            return
+        try:
+            text = await get_text(
+                owner_id,
+                "owner_digest",
+                minutes=round(self.window / 60, 1),
+                commission_count=pending.counts[COMMISSION],
+                commission_total=pending.totals[COMMISSION],
+                donation_count=pending.counts[DONATION],
+                donation_total=pending.totals[DONATION],
+                top_commission=self._top(pending.users[COMMISSION]),
+                top_donation=self._top(pending.users[DONATION]),
+            )
+            outbox.notify(pending.bot, owner_id, text, priority=PRIORITY_LOW)
+        except Exception as e:
+            logger.error(f"Failed to send owner digest to {owner_id}: {e}")
+
+
+owner_digest = OwnerDigest(OWNER_DIGEST_WINDOW, OWNER_ALERT_THRESHOLD)
+queue_depth.track("owner_digest", function=owner_digest.pending)
@@ -0,0 +1,207 @@
+# --- Стандартные библиотеки ---
+import logging
+from math import gcd
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Purchase plan objectives: key -> description
+OBJECTIVES = {
+    "spend": "Max spend",
+    "count": "Max count",
+    "scarcity": "Max scarcity",
+}
+DEFAULT_OBJECTIVE = "spend"
+
+# Above this many DP cells (gifts x budget units) the plan falls back to a greedy pass
+MAX_PLAN_CELLS = 4_000_000
+# Above this many scarcity DP states the plan falls back to a greedy pass
+MAX_PLAN_STATES = 256
+
+
+def _available(gift: dict, count: int, budget: int) -> int:
+    """How many copies of the gift can be bought at most."""
+    quantity = min(count, budget // gift["price"])
+    if gift.get("supply"):
+        quantity = min(quantity, gift.get("left") or 0)
+    return quantity
+
+
+def _scarcity(gift: dict) -> float:
+    """Scarcity of one copy: rarer limited gifts weigh more, unlimited ones add nothing."""
+    return 1 / gift["supply"] if gift.get("supply") else 0.0
+
+
+def _chunks(quantity: int):
+    """Binary split of a bounded quantity: 1, 2, 4, ..., rest — any 0..quantity is a subset sum."""
+    size = 1
+    while quantity > 0:
+        chunk = min(size, quantity)
+        yield chunk
+        quantity -= chunk
+        size *= 2
+
+
+def _greedy(items: List[Tuple[int, int]], count: int, budget: int, key) -> Dict[int, int]:
+    """
+    Fallback for oversized inputs: takes (price, quantity) items in `key` order.
+    Returns {item index: quantity}.
+    """
+    taken = {}
+    for i in sorted(range(len(items)), key=key):
+        price, quantity = items[i]
+        quantity = min(quantity, count, budget // price)
+        if quantity > 0:
+            taken[i] = quantity
+            count -= quantity
+            budget -= quantity * price
+    return taken
+
+
+def _plan_by_sum(items: List[Tuple[int, int]], count: int, budget: int, objective: str) -> Dict[int, int]:
+    """
+    Exact plan for the count and spend objectives.
+    reach[c] is a bitmask of spends (in units of the price gcd) reachable with exactly
+    c gifts; each binary chunk of an item is one shift-or per c, so the DP runs on
+    Python big integers instead of per-state loops.
+    """
+    unit = 0
+    for price, _ in items:
+        unit = gcd(unit, price)
+    units = min(budget, count * max(price for price, _ in items)) // unit
+    if (units + 1) * (count + 1) * len(items) > MAX_PLAN_CELLS:
+        logger.info(f"Purchase plan: {len(items)} gifts x {units} units, using greedy plan")
+        if objective == "count":
+            return _greedy(items, count, budget, key=lambda i: items[i][0])
+        return _greedy(items, count, budget, key=lambda i: -items[i][0])
+
+    mask = (1 << (units + 1)) - 1
+    reach = [1] + [0] * count
+    steps = []  # (item index, chunk, shift, reach before the chunk)
+    for i, (price, quantity) in enumerate(items):
+        for chunk in _chunks(quantity):
+            shift = chunk * price // unit
+            if shift > units or chunk > count:
+                break
+            before = reach[:]
+            for c in range(count, chunk - 1, -1):
+                if before[c - chunk]:
+                    reach[c] |= (before[c - chunk] << shift) & mask
+            steps.append((i, chunk, shift, before))
+
+    # count: most gifts, then most stars; spend: most stars, then most gifts
+    if objective == "count":
+        best = max((c, reach[c].bit_length() - 1) for c in range(count + 1) if reach[c])
+        c, b = best
+    else:
+        b, c = max((reach[c].bit_length() - 1, c) for c in range(count + 1) if reach[c])
+
+    taken: Dict[int, int] = {}
+    for i, chunk, shift, before in reversed(steps):
+        if not (before[c] >> b) & 1:
+            taken[i] = taken.get(i, 0) + chunk
+            c -= chunk
+            b -= shift
+    return taken
+
+
+def _plan_by_scarcity(items: List[Tuple[int, int]], values: List[float], count: int, budget: int) -> Dict[int, int]:
+    """
+    Exact plan for the scarcity objective: DP over (stars, gifts, value) states where a
+    state is dropped if another one has no more stars, no more gifts and at least its value.
+    """
+    # state: (spent, bought, value, plan)
+    states = [(0, 0, 0.0, ())]
+    for i, (price, quantity) in enumerate(items):
+        for chunk in _chunks(quantity):
+            cost = chunk * price
+            value = chunk * values[i]
+            grown = [
+                (spent + cost, bought + chunk, total + value, plan + ((i, chunk),))
+                for spent, bought, total, plan in states
+                if bought + chunk <= count and spent + cost <= budget
+            ]
+            if not grown:
+                break
+            # Sweep by spend: prefix_best[c] is the best value kept with <= c gifts so far
+            prefix_best = [-1.0] * (count + 1)
+            frontier = []
+            for state in sorted(states + grown, key=lambda s: (s[0], s[1], -s[2])):
+                bought, total = state[1], state[2]
+                if total > prefix_best[bought]:
+                    frontier.append(state)
+                    for c in range(bought, count + 1):
+                        if prefix_best[c] >= total:
+                            break
+                        prefix_best[c] = total
+            states = frontier
+            if len(states) > MAX_PLAN_STATES:
+                logger.info(f"Purchase plan: {len(states)} states, using greedy plan")
+                return _greedy(items, count, budget, key=lambda j: (-values[j] / items[j][0], -items[j][0]))
+
+    _, _, _, plan = max(states, key=lambda s: (s[2], s[0], s[1]))
+    taken: Dict[int, int] = {}
+    for i, chunk in plan:
+        taken[i] = taken.get(i, 0) + chunk
+    return taken
+
+
+def plan_purchases(gifts: List[dict], count: int, budget: int, objective: str = DEFAULT_OBJECTIVE) -> List[Tuple[dict, int]]:
+    """
+    Optimal purchase multiset for one profile (bounded knapsack).
+
+    Maximizes the objective — total spend, gift count or scarcity (sum of 1/supply
+    over limited gifts) — under at most `count` gifts and `budget` stars, each gift
+    limited by its stock.
+
+    :param gifts: Нормализованные подарки, подходящие под профиль.
+    :param count: Сколько подарков ещё можно купить.
+    :param budget: Сколько звёзд можно потратить (min(LIMIT - SPENT, balance)).
+    :param objective: Ключ из OBJECTIVES.
+    :return: Список (подарок, количество) в порядке входного списка.
+    """
+    if objective not in OBJECTIVES:
+        objective = DEFAULT_OBJECTIVE
+    if count <= 0 or budget <= 0:
+        return []
+
+    # Items: (price, quantity) over member gifts. For count and spend gifts of equal
+    # price are interchangeable and form one item.
+    members: List[List[dict]] = []
+    items: List[Tuple[int, int]] = []
+    by_price: Dict[int, int] = {}
+    for gift in gifts:
+        if not gift.get("price") or gift["price"] > budget:
+            continue
+        if objective == "scarcity" and not gift.get("supply"):
+            continue  # unlimited gifts add no scarcity
+        quantity = _available(gift, count, budget)
+        if quantity <= 0:
+            continue
+        index = by_price.get(gift["price"]) if objective != "scarcity" else None
+        if index is None:
+            by_price[gift["price"]] = len(items)
+            members.append([gift])
+            items.append((gift["price"], quantity))
+        else:
+            members[index].append(gift)
+            items[index] = (gift["price"], min(count, items[index][1] + quantity))
+    if not items:
+        return []
+
+    if objective == "scarcity":
+        taken = _plan_by_scarcity(items, [_scarcity(group[0]) for group in members], count, budget)
+    else:
+        taken = _plan_by_sum(items, count, budget, objective)
+
+    # Spread item quantities over member gifts: scarcest (fewest left) first
+    quantities: Dict[int, int] = {}
+    for i, quantity in taken.items():
+        for gift in sorted(members[i], key=lambda g: (g.get("left") or 0) if g.get("supply") else float("inf")):
+            k = min(quantity, _available(gift, quantity, quantity * gift["price"]))
+            if k > 0:
+                quantities[id(gift)] = k
+                quantity -= k
+            if quantity <= 0:
+                break
+    return [(gift, quantities[id(gift)]) for gift in gifts if id(gift) in quantities]
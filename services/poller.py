@@ -0,0 +1,105 @@
+# --- Стандартные библиотеки ---
+import time
+from typing import Optional
+
+# --- Внутренние модули ---
+from services.config import POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_HOT_WINDOW
+from services.gifts import get_catalog_changed_at
+from services.history import catalog_history
+
+
+class AdaptivePoller:
+    """
+    Chooses the delay between catalog polls of the purchase worker.
+
+    The catalog is "hot" while it changed within `hot_window` seconds or the history
+    shows limited gifts selling (a drop is running and restocks follow): then polls run
+    every `min_interval`. Idle polls back off exponentially up to `max_interval`.
+    A flood wait from the API postpones the next poll until its deadline.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 0.5,
+        max_interval: float = 8,
+        hot_window: float = 60,
+    ):
+        """
+        :param min_interval: Задержка между опросами во время дропа, секунды.
+        :param max_interval: Максимальная задержка в простое, секунды.
+        :param hot_window: Сколько секунд после изменения каталога опрашивать быстро.
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.hot_window = hot_window
+        self.interval = min_interval
+        self._flood_until = 0.0
+        self._last_poll_at: Optional[float] = None
+        self._last_changed_at = get_catalog_changed_at()
+        # Metrics
+        self.polls = 0
+        self.total_gap = 0.0
+        self.detections = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.flood_waits = 0
+        self._remote: Optional[dict] = None  # stats of the worker process, see merge()
+
+    def is_hot(self, now: float) -> bool:
+        """True while a drop is likely running."""
+        if now - get_catalog_changed_at() <= self.hot_window:
+            return True
+        return bool(catalog_history.report(limit=1))
+
+    def flood_wait(self, retry_after: float, now: Optional[float] = None) -> None:
+        """Registers a flood wait: no polls before `retry_after` seconds pass."""
+        now = time.monotonic() if now is None else now
+        self._flood_until = max(self._flood_until, now + retry_after)
+        self.flood_waits += 1
+
+    def next_delay(self, now: Optional[float] = None) -> float:
+        """
+        Called after each poll: updates metrics and returns seconds to sleep.
+        A change seen by this poll happened at most one gap ago, which is
+        counted as its detection latency.
+        """
+        now = time.monotonic() if now is None else now
+        gap = now - self._last_poll_at if self._last_poll_at is not None else 0.0
+        self._last_poll_at = now
+        self.polls += 1
+        self.total_gap += gap
+
+        changed_at = get_catalog_changed_at()
+        if changed_at != self._last_changed_at:
+            self._last_changed_at = changed_at
+            if gap:
+                self.detections += 1
+                self.total_latency += gap
+                self.max_latency = max(self.max_latency, gap)
+
+        if self.is_hot(now):
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * 2, self.max_interval)
+        return max(self.interval, self._flood_until - now)
+
+    def merge(self, stats: dict) -> None:
+        """Stores the stats sent by the worker process; served by `stats` in a process not polling."""
+        self._remote = stats
+
+    def stats(self) -> dict:
+        """Poll cadence and detection latency (seconds) since start."""
+        if self._remote is not None:
+            return self._remote
+        return {
+            "polls": self.polls,
+            "interval": self.interval,
+            "avg_gap": self.total_gap / (self.polls - 1) if self.polls > 1 else 0.0,
+            "detections": self.detections,
+            "avg_latency": self.total_latency / self.detections if self.detections else 0.0,
+            "max_latency": self.max_latency,
+            "flood_waits": self.flood_waits,
+        }
+
+
+catalog_poller = AdaptivePoller(POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_HOT_WINDOW)
@@ -0,0 +1,85 @@
+# --- Стандартные библиотеки ---
+import asyncio
+import logging
+
+# --- Сторонние библиотеки ---
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+# --- Внутренние модули ---
+from services.config import (
+    BOT_API_URL, BOT_API_POOL_SIZE, BOT_API_POOL_PER_HOST, BOT_API_KEEPALIVE, BOT_API_DNS_TTL, BOT_API_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """
+    aiogram session with an explicitly sized, long-lived connection pool.
+    Idle keep-alive connections are kept for `keepalive` seconds and DNS answers are
+    cached, so after `warm_up` purchase calls reuse open TLS connections.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive: float = 60,
+        dns_ttl: int = 3600,
+        timeout: float = 30,
+        **kwargs
+    ):
+        """
+        :param limit: Размер пула соединений.
+        :param limit_per_host: Лимит соединений на хост (0 — без лимита).
+        :param keepalive: Сколько секунд держать простаивающее соединение.
+        :param dns_ttl: Время кэширования DNS, секунды.
+        :param timeout: Таймаут запроса к Bot API, секунды.
+        """
+        super().__init__(limit=limit, timeout=timeout, **kwargs)
+        self._connector_init.update(
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive,
+            use_dns_cache=True,
+            ttl_dns_cache=dns_ttl,
+        )
+
+    async def warm_up(self, bot: Bot, connections: int = 4) -> int:
+        """
+        Opens up to `connections` pooled connections with concurrent getMe calls.
+        Returns the number of successful calls.
+        """
+        results = await asyncio.gather(*(bot.get_me() for _ in range(connections)), return_exceptions=True)
+        return sum(not isinstance(result, Exception) for result in results)
+
+
+def create_bot_session() -> TunedAiohttpSession:
+    """Bot API session configured from environment (see services/config.py)."""
+    kwargs = {}
+    if BOT_API_URL:
+        kwargs["api"] = TelegramAPIServer.from_base(BOT_API_URL)
+    return TunedAiohttpSession(
+        limit=BOT_API_POOL_SIZE,
+        limit_per_host=BOT_API_POOL_PER_HOST,
+        keepalive=BOT_API_KEEPALIVE,
+        dns_ttl=BOT_API_DNS_TTL,
+        timeout=BOT_API_TIMEOUT,
+        **kwargs
+    )
+
+
+async def keep_session_warm(bot: Bot, connections: int, interval: float):
+    """
+    Background task: re-warms the pool every `interval` seconds (below the keep-alive
+    timeout), so the first send_gift of a drop never pays TCP/TLS setup.
+    """
+    while True:
+        try:
+            opened = await bot.session.warm_up(bot, connections)
+            if opened < connections:
+                logger.warning(f"Bot API warm-up: {opened}/{connections} connections")
+        except Exception as e:
+            logger.error(f"Error in keep_session_warm: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,117 @@
+# --- Стандартные библиотеки ---
+import asyncio
+import logging
+import multiprocessing
+import threading
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(user_id: int, shards: int) -> int:
+    """Stable shard index of a user: the same user always lands on the same worker."""
+    return user_id % shards if shards > 1 else 0
+
+
+class ShardPool:
+    """
+    Parent side of the purchase worker shards.
+
+    Starts `shards` processes running `target(index, conn)` and broadcasts every catalog
+    fetched by the single poller of the parent to all of them. A shard that died is
+    restarted on the next broadcast.
+    """
+
+    def __init__(self, target: Callable, shards: int):
+        """
+        :param target: Точка входа процесса шарда (импортируемая функция модуля).
+        :param shards: Количество процессов.
+        """
+        self.target = target
+        self.shards = shards
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * shards
+        self._pipes: List = [None] * shards
+
+    def _start(self, index: int) -> None:
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=self.target, args=(index, receiver), name=f"gift-shard-{index}", daemon=True
+        )
+        process.start()
+        receiver.close()
+        self._processes[index] = process
+        self._pipes[index] = sender
+        logger.info(f"Started purchase shard {index + 1}/{self.shards} (pid {process.pid})")
+
+    def start(self) -> None:
+        for index in range(self.shards):
+            self._start(index)
+
+    def broadcast(self, api_gifts) -> None:
+        """Sends a get_available_gifts() response to every shard."""
+        payload = api_gifts.model_dump(mode="json", exclude_none=True)
+        for index, process in enumerate(self._processes):
+            if process is None or not process.is_alive():
+                logger.error(f"Purchase shard {index + 1} is not running, restarting")
+                self._start(index)
+            try:
+                self._pipes[index].send(payload)
+            except (BrokenPipeError, OSError) as e:
+                logger.error(f"Failed to send catalog to shard {index + 1}: {e}")
+
+    def stop(self, timeout: float = 5) -> None:
+        for sender in self._pipes:
+            if sender is not None:
+                try:
+                    sender.send(None)
+                    sender.close()
+                except (BrokenPipeError, OSError):
+                    pass
+        for process in self._processes:
+            if process is not None:
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+
+
+class CatalogFeed:
+    """
+    Shard side of the catalog broadcast.
+    A reader thread drains the pipe so the parent never blocks on a busy shard;
+    `next()` returns only the newest catalog, older ones are skipped.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._latest = None
+        self._closed = False
+        self._event = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        threading.Thread(target=self._read, name="catalog-feed", daemon=True).start()
+
+    def _read(self) -> None:
+        while True:
+            try:
+                payload = self._conn.recv()
+            except (EOFError, OSError):
+                payload = None
+            self._loop.call_soon_threadsafe(self._put, payload)
+            if payload is None:
+                return
+
+    def _put(self, payload) -> None:
+        if payload is None:
+            self._closed = True
+        else:
+            self._latest = payload
+        self._event.set()
+
+    async def next(self) -> Optional[dict]:
+        """Waits for a catalog newer than the last one returned; None once the parent stops."""
+        await self._event.wait()
+        self._event.clear()
+        if self._closed:
+            return None
+        payload, self._latest = self._latest, None
+        return payload
@@ -0,0 +1,191 @@
+# --- Стандартные библиотеки ---
+import json
+import math
+import time
+from typing import Dict, List
+
+# --- Внутренние модули ---
+from services.config import TIMINGS_ENABLED
+
+# Log-scale buckets: 10 µs .. ~10 min, each bucket 25% wider than the previous one,
+# so a reported percentile is at most 25% above the real value.
+BUCKET_MIN = 1e-5
+BUCKET_GROWTH = 1.25
+BUCKETS = 82
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """Fixed log-bucket latency histogram; cheap to update and to merge between processes."""
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        if seconds <= BUCKET_MIN:
+            index = 0
+        else:
+            index = min(int(math.log(seconds / BUCKET_MIN) / _LOG_GROWTH) + 1, BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def since(self, base: "Histogram") -> "Histogram":
+        """
+        Samples added after `base`, an earlier snapshot of this histogram.
+        The max of that part is unknown; the upper bound of its top bucket is used.
+        """
+        result = Histogram()
+        result.counts = [a - b for a, b in zip(self.counts, base.counts)]
+        result.count = self.count - base.count
+        result.total = self.total - base.total
+        top = max((index for index, count in enumerate(result.counts) if count), default=None)
+        if top is not None:
+            result.max = min(BUCKET_MIN * BUCKET_GROWTH ** top, self.max)
+        return result
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile, seconds."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * q / 100)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(BUCKET_MIN * BUCKET_GROWTH ** index, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        result = {"count": self.count, "mean": self.total / self.count if self.count else 0.0, "max": self.max}
+        for q in PERCENTILES:
+            result[f"p{q}"] = self.percentile(q)
+        return result
+
+    def to_dict(self) -> dict:
+        return {"counts": self.counts, "count": self.count, "total": self.total, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Histogram":
+        histogram = cls()
+        histogram.counts = list(data["counts"])[:BUCKETS] + [0] * max(0, BUCKETS - len(data["counts"]))
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class _Timer:
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings: "StageTimings", name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class StageTimings:
+    """
+    Latency of purchase-path stages (catalog fetch, matching, send_gift, balance update...).
+
+    `with timings.stage("send_gift"): ...` records one sample. When disabled the same call
+    returns a shared no-op context manager, so instrumented code costs one attribute check.
+    Histograms of other processes (worker role, shards) arrive through `merge` and are
+    included in `summary`. Their reports are cumulative, so `reset` keeps the last one of
+    each process as a baseline and `summary` counts only samples added after it.
+    """
+
+    def __init__(self, enabled: bool = False):
+        """
+        :param enabled: Собирать ли замеры.
+        """
+        self.enabled = enabled
+        self._local: Dict[str, Histogram] = {}
+        self._remote: Dict[str, Dict[str, Histogram]] = {}  # source -> stage -> histogram
+        self._baseline: Dict[str, Dict[str, Histogram]] = {}  # source -> stage -> histogram at reset
+
+    def stage(self, name: str):
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+
+    def record(self, name: str, seconds: float) -> None:
+        histogram = self._local.get(name)
+        if histogram is None:
+            histogram = self._local[name] = Histogram()
+        histogram.add(seconds)
+
+    def export(self) -> dict:
+        """Raw histograms of this process, for `merge` in another one."""
+        return {name: histogram.to_dict() for name, histogram in self._local.items()}
+
+    def merge(self, source: str, stages: dict) -> None:
+        """Replaces the histograms last reported by `source` (cumulative since its start)."""
+        self._remote[source] = {name: Histogram.from_dict(data) for name, data in stages.items()}
+        baseline = self._baseline.get(source)
+        if baseline and any(
+            name not in self._remote[source] or self._remote[source][name].count < histogram.count
+            for name, histogram in baseline.items()
+        ):
+            # The process restarted since the reset: its report is all new samples
+            del self._baseline[source]
+
+    def _since_reset(self, source: str) -> Dict[str, Histogram]:
+        stages = self._remote[source]
+        baseline = self._baseline.get(source)
+        if not baseline:
+            return stages
+        return {
+            name: histogram.since(baseline[name]) if name in baseline else histogram
+            for name, histogram in stages.items()
+        }
+
+    def summary(self) -> Dict[str, dict]:
+        """Per stage: count, mean, max and p50/p95/p99 in seconds, all processes combined."""
+        combined: Dict[str, Histogram] = {}
+        for stages in (self._local, *(self._since_reset(source) for source in self._remote)):
+            for name, histogram in stages.items():
+                combined.setdefault(name, Histogram()).merge(histogram)
+        return {name: combined[name].summary() for name in sorted(combined) if combined[name].count}
+
+    def dump(self) -> str:
+        return json.dumps({"enabled": self.enabled, "stages": self.summary()}, indent=2)
+
+    def reset(self) -> None:
+        self._local.clear()
+        self._baseline = dict(self._remote)
+
+
+timings = StageTimings(TIMINGS_ENABLED)
@@ -0,0 +1,117 @@
+# --- Стандартные библиотеки ---
+import asyncio
+import hmac
+import logging
+import secrets
+from typing import Optional, Set
+
+# --- Сторонние библиотеки ---
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+# --- Внутренние модули ---
+from services.metrics import queue_depth
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookHandler:
+    """
+    aiohttp endpoint receiving Telegram updates.
+
+    Each update is answered right away and processed as a task; at most `max_concurrency`
+    updates are in flight, further requests wait for a free slot (backpressure to Telegram,
+    which retries slow deliveries) instead of piling up unbounded tasks.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, secret: str, max_concurrency: int = 64):
+        """
+        :param dp: Диспетчер aiogram.
+        :param bot: Экземпляр бота.
+        :param secret: secret_token вебхука, проверяется в каждом запросе.
+        :param max_concurrency: Максимум одновременно обрабатываемых апдейтов.
+        """
+        if not secret:
+            raise ValueError("Webhook secret must not be empty")
+        self.dp = dp
+        self.bot = bot
+        self.secret = secret
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self.handled = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, "").encode(), self.secret.encode()):
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except ValueError:
+            return web.Response(status=400)
+        await self._slots.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: Update) -> None:
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception as e:
+            logger.error(f"Webhook update {update.update_id} failed: {e}")
+        finally:
+            self.handled += 1
+            self._slots.release()
+
+    async def close(self) -> None:
+        """Waits for updates still being processed."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def create_webhook_app(handler: WebhookHandler, path: str) -> web.Application:
+    app = web.Application()
+    app.router.add_post(path, handler.handle)
+    return app
+
+
+async def run_webhook(
+    dp: Dispatcher,
+    bot: Bot,
+    base_url: str,
+    path: str = "/webhook",
+    secret: Optional[str] = None,
+    host: str = "0.0.0.0",
+    port: int = 8080,
+    max_concurrency: int = 64,
+) -> None:
+    """
+    Serves updates from an embedded aiohttp server instead of long polling.
+    Registers `base_url + path` as the bot webhook and runs until cancelled.
+    Without `secret` a random one is generated for this run, so the endpoint never
+    accepts unsigned requests.
+    """
+    if not secret:
+        secret = secrets.token_urlsafe(32)
+        logger.info("Webhook mode: WEBHOOK_SECRET not set, using a random secret token")
+    handler = WebhookHandler(dp, bot, secret, max_concurrency)
+    queue_depth.track("webhook_updates", function=lambda: len(handler._tasks))
+    runner = web.AppRunner(create_webhook_app(handler, path))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    await bot.set_webhook(
+        base_url.rstrip("/") + path,
+        secret_token=secret,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    logger.info(f"Webhook mode: listening on {host}:{port}{path}")
+    await dp.emit_startup(bot=bot, dispatcher=dp, **dp.workflow_data)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await dp.emit_shutdown(bot=bot, dispatcher=dp, **dp.workflow_data)
+        await runner.cleanup()
+        await handler.close()
+        await bot.session.close()
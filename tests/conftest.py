@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:TEST")
+os.environ.setdefault("TELEGRAM_USER_ID", "1")
+# main.py opens its FSM storage at import time, before any test changes directory
+os.environ.setdefault("FSM_STORAGE_PATH", os.path.join(tempfile.mkdtemp(prefix="tests_"), "fsm.sqlite3"))
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Runs each test in an empty data directory (users/, logs/, owner_data.json)."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services import menu
+from services.outbox import outbox
+
+CHAT_ID = USER_ID = 42
+
+
+class FakeBot:
+    """Records the message calls made by the menu code."""
+
+    def __init__(self):
+        self.calls = []
+        self._next_id = 100
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self._next_id += 1
+        self.calls.append(("send", self._next_id, text))
+        return SimpleNamespace(message_id=self._next_id)
+
+    async def edit_message_text(self, chat_id, message_id, text, reply_markup=None):
+        self.calls.append(("edit", message_id, text))
+
+    async def delete_message(self, chat_id, message_id):
+        self.calls.append(("delete", message_id, None))
+
+
+@pytest.fixture(autouse=True)
+def menu_state(monkeypatch):
+    monkeypatch.setattr(menu, "MENU_DEBOUNCE_WINDOW", 0)
+    monkeypatch.setattr(outbox, "chat_interval", 0)
+    menu._menu_messages.clear()
+    menu._menu_cache.clear()
+
+
+async def show_menu(bot, message_id):
+    await menu.update_menu(bot, CHAT_ID, USER_ID, message_id)
+
+
+def test_main_menu_button_on_settings_screen_restores_menu():
+    async def scenario():
+        bot = FakeBot()
+        await show_menu(bot, 1)
+        (_, menu_id, menu_text), = bot.calls
+        # settings_menu edits the menu message into the Settings screen
+        await bot.edit_message_text(CHAT_ID, menu_id, "Settings")
+        bot.calls.clear()
+        # "main_menu" pressed on that message
+        await show_menu(bot, menu_id)
+        return bot.calls, menu_id, menu_text
+
+    calls, menu_id, menu_text = asyncio.run(scenario())
+    assert calls == [("edit", menu_id, menu_text)]
+
+
+def test_detached_result_text_is_kept_below_a_new_menu():
+    async def scenario():
+        bot = FakeBot()
+        await show_menu(bot, 1)
+        (_, menu_id, _), = bot.calls
+        # catalog_main_menu edits the menu message into a result text that must stay
+        await bot.edit_message_text(CHAT_ID, menu_id, "Catalog closed")
+        await menu.detach_menu_message(USER_ID, menu_id)
+        bot.calls.clear()
+        await show_menu(bot, menu_id)
+        return bot.calls
+
+    calls = asyncio.run(scenario())
+    assert [call[0] for call in calls] == ["send"]
@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+
+import main
+from handlers import handlers_wizard
+from services.database import get_user_data, update_user_data
+
+USER_ID = 42
+
+
+class FakeMessage:
+    async def edit_text(self, text, reply_markup=None):
+        self.text = text
+
+
+class FakeCall:
+    def __init__(self, data):
+        self.data = data
+        self.from_user = SimpleNamespace(id=USER_ID)
+        self.message = FakeMessage()
+
+    async def answer(self, text=None, **kwargs):
+        self.answered = text
+
+
+def test_goal_toggle_reaches_the_purchase_planner(monkeypatch):
+    objectives = []
+
+    def plan_purchases(gifts, count, budget, objective):
+        objectives.append(objective)
+        return []
+
+    async def get_filtered_gifts(*args, **kwargs):
+        return [{"id": "gift", "price": 100, "sticker_file_id": None}]
+
+    monkeypatch.setattr(main, "plan_purchases", plan_purchases)
+    monkeypatch.setattr(main, "get_filtered_gifts", get_filtered_gifts)
+
+    async def scenario():
+        await update_user_data(USER_ID, lambda data: data.update(balance=1000))
+        await main.process_user_profiles(USER_ID, await get_user_data(USER_ID))
+        call = FakeCall("edit_profile_objective_0")
+        await handlers_wizard.edit_profile_objective(call)
+        await main.process_user_profiles(USER_ID, await get_user_data(USER_ID))
+        return call
+
+    call = asyncio.run(scenario())
+    assert objectives == ["spend", "count"]
+    assert "Max count" in call.message.text